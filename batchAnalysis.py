@@ -0,0 +1,240 @@
+# Offline batch analysis of recorded clotting videos
+# Fans recorded files across a process pool, runs the CameraTracker logic on each
+# and streams per-file displacement time series plus summary metrics into one
+# SQLite results store. Each file is committed in a single transaction, so an
+# interrupted batch resumes by simply running the same command again.
+#
+# Usage:
+#   python batchAnalysis.py recordings/ --db results.sqlite
+#   python batchAnalysis.py recordings/ --param DISTANCE_THRESHOLD=1.5 --workers 6
+
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+VIDEO_EXTENSIONS = ('.mp4', '.avi', '.mov', '.mkv', '.m4v', '.wmv')
+DEFAULT_FPS = 30.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    path TEXT NOT NULL,
+    params_key TEXT NOT NULL,
+    params TEXT NOT NULL,
+    file_size INTEGER,
+    file_mtime REAL,
+    frames INTEGER,
+    duration_s REAL,
+    total_distance REAL,
+    max_abs_distance REAL,
+    lock_fraction REAL,
+    updates INTEGER,
+    processing_fps REAL,
+    error TEXT,
+    finished_at TEXT,
+    PRIMARY KEY (path, params_key)
+);
+CREATE TABLE IF NOT EXISTS samples (
+    path TEXT NOT NULL,
+    params_key TEXT NOT NULL,
+    frame INTEGER NOT NULL,
+    t REAL NOT NULL,
+    total_distance REAL NOT NULL,
+    center_x REAL,
+    center_y REAL,
+    PRIMARY KEY (path, params_key, frame)
+);
+"""
+
+
+def params_key(params):
+    """Stable short hash of a tracker parameter set"""
+    return hashlib.sha1(json.dumps(params, sort_keys=True).encode()).hexdigest()[:12]
+
+
+def find_videos(paths):
+    """Expand files and directories into a sorted list of video files"""
+    found = []
+    for path in paths:
+        if os.path.isdir(path):
+            for dirpath, _, filenames in os.walk(path):
+                found.extend(os.path.join(dirpath, name) for name in filenames
+                             if name.lower().endswith(VIDEO_EXTENSIONS))
+        elif os.path.isfile(path):
+            found.append(path)
+        else:
+            print(f"Warning: {path} does not exist, skipping.")
+    return sorted(os.path.abspath(path) for path in found)
+
+
+def _init_worker():
+    # One OpenCV thread per process; the pool already uses every core
+    import cv2 as cv
+    cv.setNumThreads(1)
+
+
+def analyze_video(path, params):
+    """Run a fresh CameraTracker over one recorded video.
+
+    Returns (summary dict, list of (frame, t, total_distance, center_x, center_y)).
+    Runs in a worker process, so it must only take and return picklable data.
+    """
+    import cv2 as cv
+    from cameraTracker import CameraTracker
+
+    tracker = CameraTracker(camera_id=os.path.basename(path))
+    for name, value in params.items():
+        if not hasattr(tracker, name):
+            raise ValueError(f"Unknown tracker parameter {name}")
+        setattr(tracker, name, value)
+
+    cap = cv.VideoCapture(path)
+    if not cap.isOpened():
+        raise IOError(f"Could not open {path}")
+    fps = cap.get(cv.CAP_PROP_FPS) or DEFAULT_FPS
+
+    samples = []
+    locked_frames = 0
+    updates = 0
+    last_center = None
+    max_abs = 0.0
+    start = time.perf_counter()
+
+    frame_idx = 0
+    while True:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        t = frame_idx / fps
+        tracker.track(frame, timestamp=t)
+
+        center = tracker.last_drawn_center
+        if center is not None:
+            locked_frames += 1
+            if center != last_center:
+                updates += 1
+                last_center = center
+        max_abs = max(max_abs, abs(tracker.total_distance))
+        samples.append((frame_idx, t, float(tracker.total_distance),
+                        None if center is None else float(center[0]),
+                        None if center is None else float(center[1])))
+        frame_idx += 1
+
+    cap.release()
+    elapsed = time.perf_counter() - start
+
+    summary = {
+        'frames': frame_idx,
+        'duration_s': frame_idx / fps,
+        'total_distance': float(tracker.total_distance),
+        'max_abs_distance': max_abs,
+        'lock_fraction': locked_frames / frame_idx if frame_idx else 0.0,
+        'updates': updates,
+        'processing_fps': frame_idx / elapsed if elapsed > 0 else 0.0,
+    }
+    return summary, samples
+
+
+class ResultsStore:
+    """SQLite store for batch results, written only from the parent process"""
+    def __init__(self, db_path):
+        self.conn = sqlite3.connect(db_path)
+        self.conn.executescript(SCHEMA)
+
+    def is_done(self, path, key):
+        """True if this file was fully analyzed with these parameters and is unchanged"""
+        row = self.conn.execute(
+            "SELECT file_size, file_mtime, error FROM runs WHERE path = ? AND params_key = ?",
+            (path, key)).fetchone()
+        if row is None or row[2] is not None:
+            return False
+        stat = os.stat(path)
+        return row[0] == stat.st_size and row[1] == stat.st_mtime
+
+    def write_result(self, path, key, params, summary, samples, error=None):
+        """Replace any previous result for (path, key) in one transaction"""
+        stat = os.stat(path)
+        summary = summary or {}
+        with self.conn:
+            self.conn.execute("DELETE FROM samples WHERE path = ? AND params_key = ?", (path, key))
+            self.conn.execute(
+                "INSERT OR REPLACE INTO runs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, datetime('now'))",
+                (path, key, json.dumps(params, sort_keys=True), stat.st_size, stat.st_mtime,
+                 summary.get('frames'), summary.get('duration_s'), summary.get('total_distance'),
+                 summary.get('max_abs_distance'), summary.get('lock_fraction'), summary.get('updates'),
+                 summary.get('processing_fps'), error))
+            if samples:
+                self.conn.executemany(
+                    "INSERT INTO samples VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    ((path, key) + sample for sample in samples))
+
+    def close(self):
+        self.conn.close()
+
+
+def run_batch(paths, db_path, params=None, workers=None):
+    """Analyze every pending video in paths and store the results in db_path"""
+    params = params or {}
+    key = params_key(params)
+    store = ResultsStore(db_path)
+
+    videos = find_videos(paths)
+    pending = [path for path in videos if not store.is_done(path, key)]
+    print(f"{len(videos)} videos found, {len(videos) - len(pending)} already done, "
+          f"{len(pending)} to analyze (params {key})")
+
+    done = 0
+    executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker)
+    try:
+        futures = {executor.submit(analyze_video, path, params): path for path in pending}
+        for future in as_completed(futures):
+            path = futures[future]
+            try:
+                summary, samples = future.result()
+                store.write_result(path, key, params, summary, samples)
+                print(f"[{done + 1}/{len(pending)}] {os.path.basename(path)}: "
+                      f"{summary['total_distance']:.2f}px over {summary['duration_s']:.1f}s "
+                      f"({summary['processing_fps']:.0f} fps)")
+            except Exception as e:
+                store.write_result(path, key, params, None, None, error=str(e))
+                print(f"[{done + 1}/{len(pending)}] {os.path.basename(path)}: error {e}")
+            done += 1
+    except KeyboardInterrupt:
+        print("Interrupted, finished files are saved; rerun to resume.")
+        raise
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+        store.close()
+    return done
+
+
+def parse_param(text):
+    """Parse NAME=VALUE into (name, number-or-string)"""
+    name, _, value = text.partition('=')
+    try:
+        value = json.loads(value)
+    except ValueError:
+        pass
+    return name.strip(), value
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batch-analyze recorded clotting videos")
+    parser.add_argument("paths", nargs="+", help="video files or directories to scan")
+    parser.add_argument("--db", default="batch_results.sqlite", help="SQLite results store")
+    parser.add_argument("--param", action="append", default=[], type=parse_param,
+                        help="tracker attribute override, e.g. DISTANCE_THRESHOLD=1.5")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    args = parser.parse_args()
+
+    try:
+        run_batch(args.paths, args.db, params=dict(args.param), workers=args.workers)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,215 @@
+# Per-camera lens calibration and pixel-to-millimetre scale
+# Computed once from checkerboard captures and stored per camera identity (the
+# same identity cameraDiscovery uses), so a rig keeps its calibration when the
+# camera moves to another port. Tracking stays in raw pixels; only the tracked
+# centre points are undistorted, through a per-pixel lookup table computed once
+# with cv.undistortPoints and cached next to the calibration. That costs a
+# bilinear lookup per point instead of a full-frame remap per frame.
+#
+# Usage:
+#   python cameraCalibration.py --device /dev/video0 --board 9x6 --square 2.5
+#   python cameraCalibration.py --images shots/*.png --identity usb-cam-1 --board 9x6 --square 2.5
+
+import argparse
+import glob
+import json
+import os
+import re
+import time
+
+import numpy as np
+import cv2 as cv
+
+CALIBRATION_DIR = "calibration"
+
+
+def calibration_path(identity, directory=CALIBRATION_DIR):
+    """JSON file for a camera identity; identities can contain path separators"""
+    return os.path.join(directory, re.sub(r'[^A-Za-z0-9._-]', '_', identity) + ".json")
+
+
+def find_board(image, board):
+    """Sub-pixel checkerboard corners in a grayscale or BGR image, or None"""
+    gray = image if image.ndim == 2 else cv.cvtColor(image, cv.COLOR_BGR2GRAY)
+    found, corners = cv.findChessboardCorners(gray, board, cv.CALIB_CB_ADAPTIVE_THRESH | cv.CALIB_CB_NORMALIZE_IMAGE)
+    if not found:
+        return None
+    criteria = (cv.TERM_CRITERIA_EPS + cv.TERM_CRITERIA_MAX_ITER, 30, 0.001)
+    return cv.cornerSubPix(gray, corners, (11, 11), (-1, -1), criteria)
+
+
+class CameraCalibration:
+    """Intrinsics, distortion and mm-per-pixel scale for one camera"""
+    def __init__(self, camera_matrix, dist_coeffs, image_size, mm_per_px, rms=None):
+        self.camera_matrix = np.asarray(camera_matrix, dtype=np.float64)
+        self.dist_coeffs = np.asarray(dist_coeffs, dtype=np.float64).reshape(-1)
+        self.image_size = tuple(int(v) for v in image_size)  # (width, height) of the calibration images
+        self.mm_per_px = float(mm_per_px)                     # in undistorted pixels at the board plane
+        self.rms = rms
+        self.table = None
+
+    @classmethod
+    def from_board_images(cls, images, board=(9, 6), square_mm=1.0):
+        """Calibrate from checkerboard views; board is inner corners (columns, rows)"""
+        image_points = []
+        size = None
+        for image in images:
+            corners = find_board(image, board)
+            if corners is not None:
+                image_points.append(corners)
+                size = (image.shape[1], image.shape[0])
+        return cls.from_corners(image_points, size, board, square_mm)
+
+    @classmethod
+    def from_corners(cls, image_points, size, board=(9, 6), square_mm=1.0):
+        """Calibrate from detected corner sets, each (columns * rows, 1, 2) in row-major order"""
+        if len(image_points) < 3:
+            raise ValueError(f"checkerboard found in {len(image_points)} images; need at least 3")
+        grid = np.zeros((board[0] * board[1], 3), np.float32)
+        grid[:, :2] = np.mgrid[0:board[0], 0:board[1]].T.reshape(-1, 2) * square_mm
+        image_points = [np.asarray(corners, dtype=np.float32).reshape(-1, 1, 2) for corners in image_points]
+        rms, matrix, dist, _, _ = cv.calibrateCamera([grid] * len(image_points), image_points, size, None, None)
+        calibration = cls(matrix, dist, size, 1.0, rms)
+
+        # Scale from the undistorted spacing of neighbouring corners
+        spacings = []
+        for corners in image_points:
+            pts = calibration.undistort_points(corners.reshape(-1, 2)).reshape(board[1], board[0], 2)
+            spacings.append(np.linalg.norm(np.diff(pts, axis=1), axis=2).ravel())
+            spacings.append(np.linalg.norm(np.diff(pts, axis=0), axis=2).ravel())
+        calibration.mm_per_px = square_mm / float(np.median(np.concatenate(spacings)))
+        return calibration
+
+    def undistort_points(self, points):
+        """Exact undistortion of (N, 2) pixel points into undistorted pixel coordinates"""
+        pts = np.asarray(points, dtype=np.float64).reshape(-1, 1, 2)
+        return cv.undistortPoints(pts, self.camera_matrix, self.dist_coeffs,
+                                  P=self.camera_matrix).reshape(-1, 2)
+
+    def build_table(self):
+        """Undistorted coordinates of every pixel, (H, W, 2) float32"""
+        w, h = self.image_size
+        xs, ys = np.meshgrid(np.arange(w, dtype=np.float64), np.arange(h, dtype=np.float64))
+        pts = np.stack([xs.ravel(), ys.ravel()], axis=1)
+        return self.undistort_points(pts).reshape(h, w, 2).astype(np.float32)
+
+    def lookup(self, points, frame_size=None):
+        """Undistorted calibration-pixel coordinates for (N, 2) points via the cached table.
+
+        frame_size is (width, height) of the frames the points came from, when they
+        were captured or decoded at a different size than the calibration images.
+        """
+        if self.table is None:
+            self.table = self.build_table()
+        pts = np.asarray(points, dtype=np.float64).reshape(-1, 2).copy()
+        w, h = self.image_size
+        if frame_size is not None:
+            pts *= (w / frame_size[0], h / frame_size[1])
+        x = np.clip(pts[:, 0], 0, w - 1.001)
+        y = np.clip(pts[:, 1], 0, h - 1.001)
+        x0, y0 = x.astype(np.int64), y.astype(np.int64)
+        fx, fy = (x - x0)[:, None], (y - y0)[:, None]
+        t = self.table
+        top = t[y0, x0] * (1 - fx) + t[y0, x0 + 1] * fx
+        bottom = t[y0 + 1, x0] * (1 - fx) + t[y0 + 1, x0 + 1] * fx
+        return top * (1 - fy) + bottom * fy
+
+    def to_mm(self, points, frame_size=None):
+        """Undistorted positions in millimetres, for (N, 2) pixel points"""
+        return self.lookup(points, frame_size) * self.mm_per_px
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp = path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump({"camera_matrix": self.camera_matrix.tolist(), "dist_coeffs": self.dist_coeffs.tolist(),
+                       "image_size": list(self.image_size), "mm_per_px": self.mm_per_px, "rms": self.rms,
+                       "created": time.strftime('%Y-%m-%d %H:%M:%S')}, f, indent=2)
+        os.replace(tmp, path)
+        np.save(os.path.splitext(path)[0] + "_table.npy", self.table if self.table is not None else self.build_table())
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            data = json.load(f)
+        calibration = cls(data["camera_matrix"], data["dist_coeffs"], data["image_size"],
+                          data["mm_per_px"], data.get("rms"))
+        table_path = os.path.splitext(path)[0] + "_table.npy"
+        if os.path.exists(table_path):
+            table = np.load(table_path)
+            if table.shape == (calibration.image_size[1], calibration.image_size[0], 2):
+                calibration.table = table
+        return calibration
+
+
+def load_calibration(identity, directory=CALIBRATION_DIR):
+    """Stored calibration for a camera identity, or None"""
+    path = calibration_path(identity, directory)
+    if not os.path.exists(path):
+        return None
+    try:
+        return CameraCalibration.load(path)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"Warning: ignoring unreadable calibration {path}: {e}")
+        return None
+
+
+def capture_board_images(path, board, count=15, interval=1.0):
+    """Grab views of the checkerboard from a live device, at most one per interval"""
+    from cameraDiscovery import open_device
+    cap = open_device(path)
+    if not cap.isOpened():
+        raise RuntimeError(f"could not open camera {path}")
+    images = []
+    last = 0.0
+    try:
+        while len(images) < count:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            found = find_board(frame, board) is not None
+            if found and time.time() - last >= interval:
+                images.append(frame)
+                last = time.time()
+                print(f"Captured view {len(images)}/{count}")
+            cv.imshow("Calibration - move the board around, q to stop", frame)
+            if cv.waitKey(1) & 0xFF == ord('q'):
+                break
+    finally:
+        cap.release()
+        cv.destroyAllWindows()
+    return images
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Calibrate a rig camera from checkerboard views")
+    parser.add_argument("--device", help="capture device path or index to calibrate live")
+    parser.add_argument("--images", nargs="*", default=[], help="checkerboard images instead of a live device")
+    parser.add_argument("--identity", help="camera identity to store under (default: the device's identity)")
+    parser.add_argument("--board", default="9x6", help="inner corners, columns x rows")
+    parser.add_argument("--square", type=float, required=True, help="checkerboard square size in mm")
+    parser.add_argument("--views", type=int, default=15, help="views to capture from a live device")
+    args = parser.parse_args()
+
+    board = tuple(int(v) for v in args.board.lower().split("x"))
+    if args.device:
+        from cameraDiscovery import device_identity, index_path
+        # An index names the same node the rigs resolve, so the calibration is found under their identity
+        device = index_path(int(args.device)) if args.device.isdigit() else args.device
+        images = capture_board_images(device, board, args.views)
+        identity = args.identity or device_identity(device)
+    else:
+        paths = [p for pattern in args.images for p in glob.glob(pattern)]
+        images = [image for image in (cv.imread(p) for p in paths) if image is not None]
+        identity = args.identity
+    if not identity:
+        parser.error("--identity is required with --images")
+
+    calibration = CameraCalibration.from_board_images(images, board, args.square)
+    path = calibration_path(identity)
+    calibration.save(path)
+    print(f"Calibrated {identity}: rms {calibration.rms:.3f} px, {calibration.mm_per_px:.4f} mm/px -> {path}")
+
+
+if __name__ == '__main__':
+    main()
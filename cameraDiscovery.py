@@ -0,0 +1,223 @@
+# Camera discovery service
+# Probes capture devices concurrently with a per-device timeout, records the
+# resolutions and frame rates each one accepts, and caches the results keyed by
+# device path so later launches skip the probe. Stable device identities
+# (USB by-id names on Linux) are mapped to rig numbers and the mapping is kept
+# in the same cache file, so a rig keeps its camera across reboots and replugs.
+# Elsewhere (Windows, macOS) OpenCV only exposes capture indices, so the identity
+# is the index: a cached index is re-opened on each launch to check a camera is
+# still there, but swapping USB ports or plug order also swaps the rigs.
+
+import glob
+import json
+import os
+import sys
+import threading
+import time
+
+CACHE_FILE = "camera_cache.json"
+PROBE_TIMEOUT = 4.0  # seconds; failed opens on some drivers take several seconds
+MAX_INDEX = 10
+
+# Modes tried during capability probing, most useful first
+CANDIDATE_RESOLUTIONS = [(640, 480), (1280, 720), (1920, 1080), (320, 240)]
+CANDIDATE_FPS = [30, 60, 15]
+
+
+def list_device_paths(max_index=MAX_INDEX):
+    """Candidate device paths: /dev/videoN on Linux, integer indices elsewhere"""
+    if sys.platform.startswith("linux"):
+        return sorted(glob.glob("/dev/video*"), key=lambda p: int(p[len("/dev/video"):] or 0))
+    return [str(index) for index in range(max_index)]
+
+
+def index_path(index):
+    """Device path for a capture index, named the way list_device_paths names it"""
+    return f"/dev/video{index}" if sys.platform.startswith("linux") else str(index)
+
+
+def device_identity(path):
+    """Stable identity for a device path; the by-id name on Linux, else the path"""
+    for link in glob.glob("/dev/v4l/by-id/*"):
+        if os.path.realpath(link) == os.path.realpath(path):
+            return os.path.basename(link)
+    return path
+
+
+def open_device(path):
+    """Open a capture device from a cached path"""
+    import cv2 as cv
+    if path.isdigit():
+        return cv.VideoCapture(int(path))
+    return cv.VideoCapture(path, cv.CAP_V4L2)
+
+
+def probe_device(path):
+    """Open one device and record the modes it accepts. Returns a dict or None."""
+    import cv2 as cv
+    cap = open_device(path)
+    try:
+        if not cap.isOpened():
+            return None
+        ret, _ = cap.read()
+        if not ret:
+            # Metadata nodes (e.g. the second /dev/video of a UVC camera) open but never deliver frames
+            return None
+
+        resolutions = []
+        for width, height in CANDIDATE_RESOLUTIONS:
+            cap.set(cv.CAP_PROP_FRAME_WIDTH, width)
+            cap.set(cv.CAP_PROP_FRAME_HEIGHT, height)
+            actual = (int(cap.get(cv.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv.CAP_PROP_FRAME_HEIGHT)))
+            if actual not in resolutions:
+                resolutions.append(actual)
+
+        frame_rates = []
+        for fps in CANDIDATE_FPS:
+            cap.set(cv.CAP_PROP_FPS, fps)
+            actual = round(cap.get(cv.CAP_PROP_FPS), 2)
+            if actual > 0 and actual not in frame_rates:
+                frame_rates.append(actual)
+
+        return {
+            "path": path,
+            "identity": device_identity(path),
+            "backend": cap.getBackendName(),
+            "resolutions": [list(r) for r in resolutions],
+            "frame_rates": frame_rates,
+            "probed_at": time.time(),
+        }
+    finally:
+        cap.release()
+
+
+def device_opens(path):
+    """True if the device still opens, without reading a frame; None otherwise"""
+    cap = open_device(path)
+    try:
+        return True if cap.isOpened() else None
+    finally:
+        cap.release()
+
+
+def probe_devices(paths, timeout=PROBE_TIMEOUT, probe=probe_device):
+    """Probe every path concurrently; devices that hang past timeout are abandoned.
+
+    Probes run on daemon threads rather than a pool because a hung VideoCapture
+    open cannot be cancelled, and a pool would block interpreter exit on it.
+    """
+    results = {}
+
+    def worker(path):
+        try:
+            results[path] = probe(path)
+        except Exception as e:
+            print(f"Warning: probing {path} failed: {e}")
+            results[path] = None
+
+    threads = [threading.Thread(target=worker, args=(path,), daemon=True) for path in paths]
+    for thread in threads:
+        thread.start()
+    deadline = time.monotonic() + timeout
+    for path, thread in zip(paths, threads):
+        thread.join(max(0.0, deadline - time.monotonic()))
+        if thread.is_alive():
+            print(f"Warning: probing {path} timed out after {timeout:.1f}s")
+    return {path: results.get(path) for path in paths}
+
+
+class CameraDiscovery:
+    """Cached device discovery and identity-to-rig mapping"""
+    def __init__(self, cache_file=CACHE_FILE):
+        self.cache_file = cache_file
+        self.devices = {}   # path -> capability dict
+        self.rig_map = {}   # identity -> rig number
+        self.load()
+
+    def load(self):
+        if not os.path.exists(self.cache_file):
+            return
+        try:
+            with open(self.cache_file) as f:
+                data = json.load(f)
+            self.devices = data.get("devices", {})
+            self.rig_map = data.get("rig_map", {})
+        except (OSError, ValueError) as e:
+            print(f"Warning: ignoring unreadable camera cache {self.cache_file}: {e}")
+
+    def save(self):
+        tmp = self.cache_file + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump({"devices": self.devices, "rig_map": self.rig_map}, f, indent=2)
+        os.replace(tmp, self.cache_file)
+
+    def cache_valid(self, path):
+        """A cached entry is reused while the same device still sits at that path"""
+        info = self.devices.get(path)
+        if info is None:
+            return False
+        if path.isdigit():
+            return True  # an index says nothing about the device; discover() re-opens it
+        return os.path.exists(path) and device_identity(path) == info["identity"]
+
+    def discover(self, refresh=False, timeout=PROBE_TIMEOUT):
+        """Return {path: capability dict} for every working camera, probing only uncached paths"""
+        paths = list_device_paths()
+        to_probe = [path for path in paths if refresh or not self.cache_valid(path)]
+        # A cached index stays valid after its camera is unplugged, so check it still opens
+        indices = [path for path in paths if path.isdigit() and path not in to_probe]
+        if indices:
+            opened = probe_devices(indices, timeout, probe=device_opens)
+            for path in indices:
+                if opened[path] is None:
+                    self.devices.pop(path, None)
+        if to_probe:
+            for path, info in probe_devices(to_probe, timeout).items():
+                if info is None:
+                    self.devices.pop(path, None)
+                else:
+                    self.devices[path] = info
+        # Forget devices that have disappeared
+        self.devices = {path: info for path, info in self.devices.items() if path in paths}
+        self.assign_rigs()
+        self.save()
+        return dict(self.devices)
+
+    def assign_rigs(self):
+        """Give every present identity a rig number, keeping existing assignments.
+
+        A new camera takes the lowest number no present camera holds; a camera that
+        is gone gives up its number when that happens, so a replacement takes over
+        its rig.
+        """
+        present = {info["identity"] for info in self.devices.values()}
+        held = {rig for identity, rig in self.rig_map.items() if identity in present}
+        for info in sorted(self.devices.values(), key=lambda info: info["path"]):
+            identity = info["identity"]
+            if identity not in self.rig_map:
+                rig = next(n for n in range(1, len(held) + 2) if n not in held)
+                self.rig_map = {known: n for known, n in self.rig_map.items() if n != rig}
+                self.rig_map[identity] = rig
+                held.add(rig)
+
+    def rigs(self):
+        """{rig number: capability dict} for the cameras present right now"""
+        by_identity = {info["identity"]: info for info in self.devices.values()}
+        return {rig: by_identity[identity] for identity, rig in sorted(self.rig_map.items(), key=lambda x: x[1])
+                if identity in by_identity}
+
+
+def main():
+    discovery = CameraDiscovery()
+    start = time.perf_counter()
+    discovery.discover(refresh="--refresh" in sys.argv)
+    print(f"Discovery took {time.perf_counter() - start:.2f}s")
+    for rig, info in sorted(discovery.rigs().items()):
+        modes = ", ".join(f"{w}x{h}" for w, h in info["resolutions"])
+        print(f"Rig {rig}: {info['path']} ({info['identity']}) [{modes}] @ {info['frame_rates']} fps")
+    if not discovery.rigs():
+        print("No cameras found.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,508 @@
+# Per-camera contour tracking state, shared by the GUI and the offline tools.
+# Kept free of GUI imports so it can run in worker processes.
+
+import time
+import numpy as np
+import cv2 as cv
+
+from motionGate import MotionGate
+from frameQuality import QualityGate
+from debugTaps import Taps, draw_candidates
+from grayLut import build_gray_lut
+from trajectory import Trajectory
+
+
+class Components:
+    """Connected components of a segmentation mask as arrays, background and specks removed"""
+    def __init__(self, labels, stats, centroids, min_area=0):
+        keep = np.flatnonzero(stats[1:, cv.CC_STAT_AREA] >= min_area) + 1
+        self.labels = labels
+        self.ids = keep
+        self.boxes = stats[keep, :4]  # x, y, w, h
+        self.areas = stats[keep, cv.CC_STAT_AREA].astype(np.float64)
+        self.centroids = centroids[keep]
+
+    def __len__(self):
+        return len(self.ids)
+
+    def centers(self, mode='bbox'):
+        """(N, 2) centres: sub-pixel centroids for 'moments', else integer box midpoints"""
+        if mode == 'moments':
+            return self.centroids
+        x, y, w, h = self.boxes.T
+        return np.column_stack([x + w // 2, y + h // 2]).astype(np.float64)
+
+    def contour(self, i):
+        """Outline of component i, traced only inside its bounding box"""
+        x, y, w, h = (int(v) for v in self.boxes[i])
+        mask = (self.labels[y:y + h, x:x + w] == self.ids[i]).astype(np.uint8)
+        contours, _ = cv.findContours(mask, cv.RETR_EXTERNAL, cv.CHAIN_APPROX_SIMPLE, offset=(x, y))
+        return max(contours, key=len)
+
+
+def match_scores(dist, area, tracked_area, pos_thresh, area_thresh):
+    """(similar, cost, confidence) of candidates against a tracked sample.
+
+    dist and area may be scalars or arrays that broadcast against tracked_area.
+    Similar candidates are inside both limits; the lowest cost is the best match,
+    and confidence runs from 1 (same place and size) down to 0 at the limits.
+    """
+    dist = np.asarray(dist, dtype=np.float64)
+    big = np.maximum(area, tracked_area).astype(np.float64)
+    ratio = np.divide(np.minimum(area, tracked_area), big, out=np.zeros_like(big), where=big > 0)
+    similar = (dist < pos_thresh) & (ratio > 1 - area_thresh)
+    cost = dist / pos_thresh + (1 - ratio)
+    area_score = 1 - (1 - ratio) / area_thresh if area_thresh > 0 else (ratio == 1).astype(np.float64)
+    confidence = np.clip(np.minimum(1 - dist / pos_thresh, area_score), 0.0, 1.0)
+    return similar, cost, confidence
+
+
+class CameraTracker:
+    """Separate tracking state class for each camera"""
+    def __init__(self, camera_id):
+        self.camera_id = camera_id
+
+        # Individual tracking variables for this camera
+        self.tracked_contour = None
+        self.last_drawn_contour = None
+        self.last_drawn_center = None
+        self.last_contour_update_time = None
+        self.prev_center = None
+        self.current_center = None  # centre of the contour matched on the latest processed frame
+        self.current_area = 0.0
+        self.current_confidence = 0.0
+        self.tracked_center = None  # centre and area of the locked sample, the reference for matching
+        self.tracked_area = 0.0
+        self.total_distance = 0
+        self.tracking_locked = False
+
+        # Physical units: set calibration to a CameraCalibration to also accumulate
+        # total_distance_mm from undistorted centre points
+        self.calibration = None
+        self.frame_size = None  # (width, height) of the frames being tracked
+        self.total_distance_mm = 0.0
+
+        # Tracking parameters
+        self.CONTOUR_UPDATE_INTERVAL = 0.3
+        self.DISTANCE_THRESHOLD = 2.5
+        self.CENTER_MODE = 'bbox'  # 'bbox' (integer box midpoint) or 'moments' (sub-pixel centroid)
+
+        # Segmentation and matching parameters
+        self.BLUR_KERNEL = 5
+        self.CANNY_LOW = 100
+        self.CANNY_HIGH = 200
+        self.POS_THRESH = 50
+        self.AREA_THRESH = 0.3
+
+        # 'canny' finds edge contours; 'threshold' segments dark regions with one
+        # fused stretch/quantize/binarize LUT pass, which is cheaper; 'components'
+        # labels that same mask with connectedComponentsWithStats, so areas, boxes and
+        # centroids come back as arrays and matching needs no per-contour Python
+        self.SEGMENTATION = 'canny'
+        self.LUT_LEVELS = None       # quantize to this many grey levels first, None to skip
+        self.LUT_THRESHOLD = 20      # grey level at or below which a pixel is sample
+        self.LUT_STRETCH = None      # (lo, hi) grey levels mapped to 0-255 first, None to skip
+        self.MIN_COMPONENT_AREA = 20  # pixels; smaller components are noise
+
+        # Per-frame centre, area and match confidence; spills to the session store when full
+        self.trajectory = Trajectory()
+
+        # Skip the pipeline on frames where the tracked region has not changed
+        self.USE_MOTION_GATE = True
+        self.motion_gate = MotionGate()
+
+        # Debug views of intermediate stages; free unless something subscribes
+        self.taps = Taps()
+
+        # Skip blurred, clipped or exposure-jumped frames before segmentation
+        self.USE_QUALITY_GATE = True
+        self.quality_gate = QualityGate()
+
+        # 'contour' re-detects the sample every frame; 'phase' estimates the locked
+        # sample's shift from its anchor with FFT phase correlation on a small windowed
+        # patch, and only re-runs contour detection to re-anchor
+        self.DISPLACEMENT_MODE = 'contour'
+        self.PHASE_SCALE = 2              # downscale factor for the correlated patch
+        self.PHASE_MARGIN = 16            # pixels of context around the sample's box
+        self.PHASE_MIN_RESPONSE = 0.2     # below this peak strength the estimate is not trusted
+        self.PHASE_MAX_SHIFT = 0.25       # re-anchor once the shift passes this fraction of the patch
+        self.PHASE_REANCHOR_INTERVAL = 2.0  # seconds; re-anchor at least this often
+        self.PHASE_MAX_ERROR = 1.5        # pixels; at a re-anchor the phase estimate must be this close to
+                                          # the contour centre, else the tracker falls back to contour mode
+        self.phase_reference = None
+        self.phase_check_center = None
+        self.phase_error = None
+        self.phase_error_max = 0.0
+        self.phase_frames = 0
+        self.phase_reanchors = 0
+
+    def targets(self):
+        """Tracked samples, each with current_center, total_distance and trajectory"""
+        return [self]
+
+    def get_center(self, contour):
+        """Calculate center of contour"""
+        if self.CENTER_MODE == 'moments':
+            return self.get_centroid(contour)
+        x, y, w, h = cv.boundingRect(contour)
+        return (x + w // 2, y + h // 2)
+
+    def get_centroid(self, contour):
+        """Sub-pixel centroid from the contour's image moments.
+
+        Open edge contours can enclose no area, so those fall back to the mean of
+        their points, which is still sub-pixel.
+        """
+        m = cv.moments(contour)
+        if abs(m['m00']) > 1e-6:
+            return (m['m10'] / m['m00'], m['m01'] / m['m00'])
+        cx, cy = contour.reshape(-1, 2).mean(axis=0)
+        return (float(cx), float(cy))
+
+    def contour_scores(self, c1, c2, pos_thresh=None, area_thresh=None):
+        """match_scores of contour c2 against c1"""
+        pos_thresh = self.POS_THRESH if pos_thresh is None else pos_thresh
+        area_thresh = self.AREA_THRESH if area_thresh is None else area_thresh
+        cx1, cy1 = self.get_center(c1)
+        cx2, cy2 = self.get_center(c2)
+        return match_scores(np.hypot(cx1 - cx2, cy1 - cy2), cv.contourArea(c2), cv.contourArea(c1),
+                            pos_thresh, area_thresh)
+
+    def contours_similar(self, c1, c2, pos_thresh=None, area_thresh=None):
+        """Check if two contours are similar"""
+        return bool(self.contour_scores(c1, c2, pos_thresh, area_thresh)[0])
+
+    def match_confidence(self, c1, c2, pos_thresh=None, area_thresh=None):
+        """How closely c2 matches c1, from 1 (same place and size) down to 0 at the similarity limits"""
+        return float(self.contour_scores(c1, c2, pos_thresh, area_thresh)[2])
+
+    def preprocess(self, frame):
+        """Grayscale and blur a BGR frame"""
+        gray = frame if frame.ndim == 2 else cv.cvtColor(frame, cv.COLOR_BGR2GRAY)
+        if self.taps.subscribers:
+            self.taps.emit('gray', gray)
+        if self.BLUR_KERNEL <= 1:
+            blurred = gray
+        else:
+            blurred = cv.GaussianBlur(gray, (self.BLUR_KERNEL, self.BLUR_KERNEL), 0)
+        if self.taps.subscribers:
+            self.taps.emit('blurred', blurred)
+        return blurred
+
+    def segment(self, blurred):
+        """Binary mask of candidate sample pixels for the configured backend"""
+        if self.SEGMENTATION in ('threshold', 'components'):
+            stretch = tuple(self.LUT_STRETCH) if self.LUT_STRETCH is not None else None
+            mask = cv.LUT(blurred, build_gray_lut(self.LUT_LEVELS, self.LUT_THRESHOLD, True, stretch))
+            if self.taps.subscribers:
+                self.taps.emit('mask', mask)
+            return mask
+        edges = cv.Canny(blurred, self.CANNY_LOW, self.CANNY_HIGH)
+        if self.taps.subscribers:
+            self.taps.emit('edges', edges)
+        return edges
+
+    def detect_contours(self, blurred):
+        """Find external contours in a preprocessed frame"""
+        contours, _ = cv.findContours(self.segment(blurred), cv.RETR_EXTERNAL, cv.CHAIN_APPROX_SIMPLE)
+        return contours
+
+    def detect_components(self, blurred):
+        """Label the segmentation mask into Components"""
+        _, labels, stats, centroids = cv.connectedComponentsWithStats(self.segment(blurred), connectivity=8)
+        return Components(labels, stats, centroids, self.MIN_COMPONENT_AREA)
+
+    def detect(self, blurred):
+        """Candidates for the configured backend: Components, or a list of contours"""
+        if self.SEGMENTATION == 'components':
+            return self.detect_components(blurred)
+        return self.detect_contours(blurred)
+
+    def update(self, detections, timestamp=None):
+        """Advance tracking with the output of detect()"""
+        if isinstance(detections, Components):
+            return self.update_components(detections, timestamp)
+        return self.update_tracking(detections, timestamp)
+
+    def update_components(self, components, timestamp=None):
+        """Same as update_tracking, but matching runs on the component arrays.
+
+        Only the chosen component is traced into a contour, for drawing and the motion gate.
+        """
+        index = -1
+        confidence = 0.0
+        if len(components):
+            centers = components.centers(self.CENTER_MODE)
+            if not self.tracking_locked or self.tracked_center is None:
+                # If not locked, take the largest component
+                index = int(np.argmax(components.areas))
+                confidence = 1.0
+            else:
+                dist = np.hypot(centers[:, 0] - self.tracked_center[0], centers[:, 1] - self.tracked_center[1])
+                similar, cost, confidences = match_scores(dist, components.areas, self.tracked_area,
+                                                          self.POS_THRESH, self.AREA_THRESH)
+                if similar.any():
+                    index = int(np.argmin(np.where(similar, cost, np.inf)))
+                    confidence = float(confidences[index])
+
+        if index < 0:
+            return self.advance(None, 0.0, timestamp)
+        contour = components.contour(index)
+        self.tracked_contour = contour
+        self.tracking_locked = True
+        center = tuple(float(v) for v in centers[index]) if self.CENTER_MODE == 'moments' else \
+            tuple(int(v) for v in centers[index])
+        return self.advance(contour, confidence, timestamp, center, float(components.areas[index]))
+
+    def update_tracking(self, contours, timestamp=None):
+        """Advance the lock and distance state with this frame's contours.
+
+        timestamp is the frame time in seconds; live callers leave it as None to
+        use the wall clock, offline callers pass the video timestamp.
+        """
+        current_contour = None
+        confidence = 0.0
+
+        if contours:
+            if not self.tracking_locked:
+                # If not locked, find the largest contour
+                self.tracked_contour = max(contours, key=cv.contourArea)
+                self.tracking_locked = True
+                current_contour = self.tracked_contour
+                confidence = 1.0
+            else:
+                for contour in contours:
+                    if self.contours_similar(self.tracked_contour, contour):
+                        confidence = self.match_confidence(self.tracked_contour, contour)
+                        current_contour = contour
+                        self.tracked_contour = contour
+                        break
+
+        return self.advance(current_contour, confidence, timestamp)
+
+    def advance(self, current_contour, confidence, timestamp=None, center=None, area=None):
+        """Record this frame's match and update the throttled displacement total"""
+        if current_contour is not None:
+            self.current_center = self.get_center(current_contour) if center is None else center
+            self.current_area = cv.contourArea(current_contour) if area is None else area
+            self.tracked_center = self.current_center
+            self.tracked_area = self.current_area
+        else:
+            self.current_center = None
+            self.current_area = 0.0
+        self.current_confidence = confidence
+        if current_contour is not None:
+            self.update_distance(self, current_contour, time.time() if timestamp is None else timestamp)
+        return current_contour
+
+    def update_distance(self, target, contour, current_time):
+        """Throttled displacement update for a target matched to contour at target.current_center.
+
+        target is this tracker or one of its wells; the drawn contour and distance
+        totals only move once CONTOUR_UPDATE_INTERVAL has passed and the sample has
+        moved at least DISTANCE_THRESHOLD.
+        """
+        if (target.last_contour_update_time is not None and
+                current_time - target.last_contour_update_time < self.CONTOUR_UPDATE_INTERVAL):
+            return False
+        current_center = target.current_center
+        if target.last_drawn_center is not None:
+            # Check if the contour has moved significantly
+            dx = current_center[0] - target.last_drawn_center[0]
+            dy = current_center[1] - target.last_drawn_center[1]
+            if np.sqrt(dx ** 2 + dy ** 2) < self.DISTANCE_THRESHOLD:
+                return False
+
+        # Update the contour and center used for drawing
+        target.last_drawn_contour = contour
+        target.last_drawn_center = current_center
+
+        # Update distance traveled total
+        if target.prev_center is not None:
+            target.total_distance += target.last_drawn_center[1] - target.prev_center[1]
+            if self.calibration is not None:
+                (_, y0), (_, y1) = self.calibration.to_mm([target.prev_center, target.last_drawn_center],
+                                                          self.frame_size)
+                target.total_distance_mm += float(y1 - y0)
+
+        target.prev_center = target.last_drawn_center
+        target.last_contour_update_time = current_time
+        return True
+
+    def draw(self, frame, scale=None):
+        """Draw the last updated contour, center and distance onto frame.
+
+        scale is (sx, sy) from tracking to frame pixels, so the overlay can be
+        drawn on an already resized display buffer instead of the capture frame.
+        """
+        sx, sy = scale or (1.0, 1.0)
+        if self.last_drawn_contour is not None and self.last_drawn_center is not None:
+            # Fixed-point drawing (4 fractional bits) keeps scaled and sub-pixel geometry exact
+            points = np.round(self.last_drawn_contour.reshape(-1, 2) * (sx * 16, sy * 16)).astype(np.int32)
+            cv.polylines(frame, [points], True, (0, 255, 0), 2, cv.LINE_AA, shift=4)
+            cx, cy = self.last_drawn_center
+            cv.circle(frame, (int(round(cx * sx * 16)), int(round(cy * sy * 16))), int(round(5 * sx * 16)),
+                      (0, 0, 255), -1, cv.LINE_AA, shift=4)
+
+        # Add camera ID to the display
+        font_scale = max(0.7 * sx, 0.4)
+        cv.putText(frame, f"Camera {self.camera_id} - Distance: {self.total_distance:.2f}px",
+                   (10, int(30 * font_scale / 0.7)), cv.FONT_HERSHEY_SIMPLEX, font_scale, (0, 0, 255),
+                   2 if font_scale >= 0.6 else 1)
+        return frame
+
+    def gate_roi(self):
+        """Region the motion gate watches: the locked contour plus the matching radius"""
+        x, y, w, h = cv.boundingRect(self.tracked_contour)
+        m = int(self.POS_THRESH)
+        return (x - m, y - m, w + 2 * m, h + 2 * m)
+
+    def set_phase_anchor(self, frame, timestamp=None):
+        """Take the current sample as the reference that later frames are correlated against"""
+        self.phase_reference = None
+        if self.current_center is None or self.tracked_contour is None:
+            return
+        fh, fw = frame.shape[:2]
+        x, y, w, h = cv.boundingRect(self.tracked_contour)
+        m = self.PHASE_MARGIN
+        x0, y0 = max(x - m, 0), max(y - m, 0)
+        x1, y1 = min(x + w + m, fw), min(y + h + m, fh)
+        s = max(int(self.PHASE_SCALE), 1)
+        if (x1 - x0) // s < 8 or (y1 - y0) // s < 8:
+            return
+        self.phase_roi = (x0, y0, x1 - x0, y1 - y0)
+        self.phase_reference = self.phase_patch(frame)
+        self.phase_window = cv.createHanningWindow(self.phase_reference.shape[::-1], cv.CV_32F)
+        self.phase_anchor_center = self.current_center
+        self.phase_anchor_contour = self.tracked_contour
+        self.phase_anchor_area = self.current_area
+        self.phase_anchor_time = time.time() if timestamp is None else timestamp
+        self.phase_shift = (0.0, 0.0)     # latest estimated shift from the anchor
+        self.phase_velocity = (0.0, 0.0)  # shift change over the last estimate, for the prediction
+        self.phase_reanchors += 1
+
+    def phase_patch(self, frame, offset=(0, 0)):
+        """Grayscale, downscaled float patch of frame at the anchor ROI moved by offset; None if it leaves the frame"""
+        x, y, w, h = self.phase_roi
+        x, y = x + offset[0], y + offset[1]
+        if x < 0 or y < 0 or x + w > frame.shape[1] or y + h > frame.shape[0]:
+            return None
+        patch = frame[y:y + h, x:x + w]
+        if patch.ndim == 3:
+            patch = cv.cvtColor(patch, cv.COLOR_BGR2GRAY)
+        s = max(int(self.PHASE_SCALE), 1)
+        if s > 1:
+            patch = cv.resize(patch, (w // s, h // s), interpolation=cv.INTER_AREA)
+        return patch.astype(np.float32)
+
+    def track_phase(self, frame, timestamp=None):
+        """Estimate the sample's shift from the anchor; False if it needs re-anchoring instead"""
+        current_time = time.time() if timestamp is None else timestamp
+        expired = current_time - self.phase_anchor_time >= self.PHASE_REANCHOR_INTERVAL
+        # Move the window to where the sample is predicted to be, so it stays centred
+        # under the Hann window and only a small residual shift is measured; the
+        # offset is a whole number of downscaled pixels so the sampling grid matches
+        s = max(int(self.PHASE_SCALE), 1)
+        ox = int(round((self.phase_shift[0] + self.phase_velocity[0]) / s)) * s
+        oy = int(round((self.phase_shift[1] + self.phase_velocity[1]) / s)) * s
+        patch = self.phase_patch(frame, (ox, oy))
+        if patch is None:
+            return False
+        (rx, ry), response = cv.phaseCorrelate(self.phase_reference, patch, self.phase_window)
+        rx, ry = rx * s, ry * s
+        _, _, w, h = self.phase_roi
+        if response < self.PHASE_MIN_RESPONSE or np.hypot(rx, ry) > self.PHASE_MAX_SHIFT * min(w, h):
+            return False
+        dx, dy = ox + rx, oy + ry
+        ax, ay = self.phase_anchor_center
+        if expired:
+            # Re-anchor with contour detection, which also checks this estimate
+            self.phase_check_center = (ax + dx, ay + dy)
+            return False
+        self.phase_velocity = (dx - self.phase_shift[0], dy - self.phase_shift[1])
+        self.phase_shift = (dx, dy)
+
+        contour = self.phase_anchor_contour + np.array([round(dx), round(dy)], dtype=self.phase_anchor_contour.dtype)
+        self.tracked_contour = contour
+        self.advance(contour, float(min(response, 1.0)), timestamp, (ax + dx, ay + dy), self.phase_anchor_area)
+        self.phase_frames += 1
+        return True
+
+    def check_phase(self):
+        """Compare the phase estimate with the contour centre found when re-anchoring"""
+        predicted, self.phase_check_center = self.phase_check_center, None
+        if predicted is None or self.current_center is None:
+            return
+        self.phase_error = float(np.hypot(predicted[0] - self.current_center[0],
+                                          predicted[1] - self.current_center[1]))
+        self.phase_error_max = max(self.phase_error_max, self.phase_error)
+        if self.phase_error > self.PHASE_MAX_ERROR:
+            print(f"Camera {self.camera_id}: phase estimate {self.phase_error:.1f}px from the contour centre; "
+                  f"falling back to contour mode")
+            self.DISPLACEMENT_MODE = 'contour'
+
+    def track(self, frame, timestamp=None):
+        """Run tracking on frame without drawing; frame is only read"""
+        self.frame_size = (frame.shape[1], frame.shape[0])
+        # Unusable frames keep the previous result rather than risk a wrong lock
+        if self.USE_QUALITY_GATE and not self.quality_gate.accept(frame):
+            self.record(timestamp)
+            return
+        # Once locked, static frames reuse the previous result
+        if (not self.USE_MOTION_GATE or not self.tracking_locked or
+                self.motion_gate.needs_processing(frame, self.gate_roi(), timestamp)):
+            phase = self.DISPLACEMENT_MODE == 'phase'
+            if not (phase and self.tracking_locked and self.phase_reference is not None and
+                    self.track_phase(frame, timestamp)):
+                blurred = self.preprocess(frame)
+                detections = self.detect(blurred)
+                self.update(detections, timestamp)
+                if self.taps.watching('candidates'):
+                    self.taps.emit('candidates', draw_candidates(blurred, detections, self.tracked_contour))
+                if phase:
+                    self.check_phase()
+                    self.set_phase_anchor(frame, timestamp)
+        self.record(timestamp)
+
+    def process_contours(self, frame, timestamp=None):
+        """Process contours for this specific camera tracker"""
+        self.track(frame, timestamp)
+        # Draw the last updated contour and center on every frame
+        return self.draw(frame)
+
+    def record(self, timestamp=None):
+        """Append the latest centre to the trajectory; gated frames repeat the last result"""
+        t = time.time() if timestamp is None else timestamp
+        if self.current_center is None:
+            self.trajectory.append(t, np.nan, np.nan, 0.0, 0.0)
+        else:
+            self.trajectory.append(t, self.current_center[0], self.current_center[1],
+                                   self.current_area, self.current_confidence)
+
+    def configure(self, params):
+        """Apply tuning values between frames, keeping the lock and distance state"""
+        for name, value in params.items():
+            setattr(self, name, value)
+        # The next frame runs the full pipeline with the new values and re-anchors phase mode
+        self.motion_gate.reset()
+        self.phase_reference = None
+
+    def reset_tracking(self):
+        """Reset all tracking variables for this camera"""
+        self.tracked_contour = None
+        self.last_drawn_contour = None
+        self.last_drawn_center = None
+        self.prev_center = None
+        self.current_center = None
+        self.current_area = 0.0
+        self.current_confidence = 0.0
+        self.tracked_center = None
+        self.tracked_area = 0.0
+        self.total_distance = 0
+        self.total_distance_mm = 0.0
+        self.tracking_locked = False
+        self.motion_gate.reset()
+        self.quality_gate.reset()
+        self.phase_reference = None
+        self.phase_check_center = None
+        self.trajectory.clear()
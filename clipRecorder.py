@@ -0,0 +1,150 @@
+# Pre-trigger video clips around tracking events
+# Each camera keeps the last PRE_SECONDS of frames in memory as JPEG, so a clot,
+# a tracking loss or an operator request can be saved with the footage that led
+# up to it. The capture thread only appends a reference to the read-only frame
+# it has just published; a background thread per camera does the compression,
+# trims the ring to its time and byte budgets, and collects POST_SECONDS more
+# after a trigger. Finished clips are written to disk on their own short-lived
+# thread. If compression falls behind, the oldest uncompressed frames are
+# dropped rather than queued without bound.
+
+import csv
+import os
+import threading
+import time
+from collections import deque
+
+import numpy as np
+import cv2 as cv
+
+
+class Clip:
+    """Frames of one triggered recording, the ring's contents plus the frames after it"""
+    def __init__(self, reason, trigger_time, frames, end_time):
+        self.reasons = [reason]
+        self.trigger_time = trigger_time
+        self.frames = list(frames)  # (timestamp, jpeg bytes)
+        self.end_time = end_time
+
+
+class ClipRecorder:
+    """In-memory pre-trigger ring of compressed frames for one camera"""
+    def __init__(self, name, directory=None, pre_seconds=10.0, post_seconds=5.0,
+                 max_bytes=64 * 1024 * 1024, jpeg_quality=80, max_pending=8):
+        self.name = name                  # prefix of the clip files, e.g. "rig1"
+        self.directory = directory        # where clips are written; None keeps the ring but saves nothing
+        self.PRE_SECONDS = pre_seconds
+        self.POST_SECONDS = post_seconds
+        self.MAX_BYTES = max_bytes        # ring budget; the oldest frames go first
+        self.JPEG_QUALITY = jpeg_quality
+
+        self.cond = threading.Condition()
+        self.pending = deque(maxlen=max_pending)  # (timestamp, frame) not yet compressed
+        self.triggers = deque()                   # (reason, timestamp) not yet handled
+        self.ring = deque()                       # (timestamp, jpeg bytes)
+        self.ring_bytes = 0
+        self.clip = None                          # clip still collecting post-trigger frames
+        self.thread = None
+        self.running = False
+        self.frames_dropped = 0
+        self.clips_written = 0
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self.encode_loop, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        with self.cond:
+            self.running = False
+            self.cond.notify_all()
+
+    def add_frame(self, source, frame, timestamp):
+        """FrameSource listener; runs on the capture thread and never copies or encodes"""
+        with self.cond:
+            if len(self.pending) == self.pending.maxlen:
+                self.frames_dropped += 1
+            self.pending.append((timestamp, frame))
+            self.cond.notify()
+
+    def trigger(self, reason, timestamp=None):
+        """Save the ring and the next POST_SECONDS; safe to call from any thread"""
+        if self.directory is None:
+            return
+        with self.cond:
+            self.triggers.append((reason, time.time() if timestamp is None else timestamp))
+            self.cond.notify()
+
+    def encode_loop(self):
+        params = [cv.IMWRITE_JPEG_QUALITY, int(self.JPEG_QUALITY)]
+        while True:
+            with self.cond:
+                self.cond.wait_for(lambda: self.pending or self.triggers or not self.running)
+                if not self.running:
+                    break
+                item = self.pending.popleft() if self.pending else None
+                triggers = list(self.triggers)
+                self.triggers.clear()
+
+            for reason, timestamp in triggers:
+                self.start_clip(reason, timestamp)
+            if item is None:
+                continue
+            timestamp, frame = item
+            ok, jpeg = cv.imencode(".jpg", frame, params)
+            if not ok:
+                continue
+            jpeg = jpeg.tobytes()
+
+            self.ring.append((timestamp, jpeg))
+            self.ring_bytes += len(jpeg)
+            while self.ring and (timestamp - self.ring[0][0] > self.PRE_SECONDS or self.ring_bytes > self.MAX_BYTES):
+                self.ring_bytes -= len(self.ring.popleft()[1])
+
+            if self.clip is not None:
+                self.clip.frames.append((timestamp, jpeg))
+                if timestamp >= self.clip.end_time:
+                    self.finish_clip()
+        if self.clip is not None:
+            self.finish_clip()
+
+    def start_clip(self, reason, timestamp):
+        # Events during a clip that is still recording are noted in it rather than starting another
+        if self.clip is not None:
+            self.clip.reasons.append(reason)
+            return
+        self.clip = Clip(reason, timestamp, self.ring, timestamp + self.POST_SECONDS)
+
+    def finish_clip(self):
+        clip, self.clip = self.clip, None
+        threading.Thread(target=self.write_clip, args=(clip,), daemon=True).start()
+
+    def write_clip(self, clip):
+        """Decode the clip's JPEGs into an MJPG AVI, with a CSV of frame timestamps"""
+        if not clip.frames:
+            return
+        stamp = time.strftime('%H%M%S', time.localtime(clip.trigger_time))
+        base = os.path.join(self.directory, f"{self.name}_{clip.reasons[0]}_{stamp}")
+        os.makedirs(self.directory, exist_ok=True)
+
+        times = np.array([t for t, _ in clip.frames])
+        fps = (len(times) - 1) / (times[-1] - times[0]) if len(times) > 1 and times[-1] > times[0] else 1.0
+        writer = None
+        try:
+            for _, jpeg in clip.frames:
+                frame = cv.imdecode(np.frombuffer(jpeg, np.uint8), cv.IMREAD_COLOR)
+                if writer is None:
+                    writer = cv.VideoWriter(base + ".avi", cv.VideoWriter_fourcc(*"MJPG"), fps,
+                                            (frame.shape[1], frame.shape[0]))
+                writer.write(frame)
+        finally:
+            if writer is not None:
+                writer.release()
+
+        with open(base + ".csv", "w", newline="") as f:
+            out = csv.writer(f)
+            out.writerow(["Frame", "Timestamp", "Offset_s"])
+            for i, t in enumerate(times):
+                out.writerow([i, f"{t:.6f}", f"{t - clip.trigger_time:.3f}"])
+        self.clips_written += 1
+        print(f"{self.name}: saved {len(times)} frames around {', '.join(clip.reasons)} to {base}.avi")
@@ -0,0 +1,110 @@
+# Streaming clot-endpoint detection on a rig's displacement stream
+# While the sample flows, its tracked centre moves; when it clots, motion stops.
+# Frame-to-frame displacement is mostly pixel jitter multiplied by the frame rate,
+# so speed is measured over a fixed interval against an anchor sample instead.
+# Each interval speed is folded into running statistics (Welford mean/variance and
+# an EWMA for display), and a one-sided CUSUM test watches for the speed dropping
+# below the baseline established while the sample was still moving. Every frame
+# costs O(1), so it runs on every frame of every rig.
+
+import math
+
+
+class ClotEvent:
+    """The moment a rig's sample stopped moving"""
+    def __init__(self, rig_id, timestamp, elapsed, temperature, detected_at):
+        self.rig_id = rig_id
+        self.timestamp = timestamp      # estimated onset of motion cessation (capture time)
+        self.elapsed = elapsed          # seconds from the first tracked sample to the onset
+        self.temperature = temperature  # rig temperature at the onset
+        self.detected_at = detected_at  # capture time of the sample that raised the alarm
+
+    def __repr__(self):
+        temp = f"{self.temperature:.2f} °C" if self.temperature is not None else "unknown temperature"
+        return f"ClotEvent(rig {self.rig_id}: {self.elapsed:.1f} s at {temp})"
+
+
+class RunningStats:
+    """Welford mean and variance"""
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def add(self, x):
+        self.n += 1
+        delta = x - self.mean
+        self.mean += delta / self.n
+        self.m2 += delta * (x - self.mean)
+
+    @property
+    def std(self):
+        return math.sqrt(self.m2 / (self.n - 1)) if self.n > 1 else 0.0
+
+
+class ClotDetector:
+    """Detects motion cessation in one rig's stream of (timestamp, centre) samples"""
+    def __init__(self, rig_id=None, interval=0.5, baseline_samples=10, min_speed=3.0, drift=0.5,
+                 cusum_threshold=5.0, alpha=0.3):
+        self.rig_id = rig_id
+        self.interval = interval                  # seconds over which each speed is measured
+        self.baseline_samples = baseline_samples  # flowing intervals used to learn the flowing speed
+        self.min_speed = min_speed                # px/s; a baseline slower than this is not flowing
+        self.drift = drift                        # fraction of the baseline speed treated as still flowing
+        self.cusum_threshold = cusum_threshold    # alarm level in baseline standard deviations
+        self.alpha = alpha                        # smoothing for the displayed speed
+        self.reset()
+
+    def reset(self):
+        self.start_time = None
+        self.anchor_time = None
+        self.anchor_center = None
+        self.samples = 0
+        self.speed = 0.0           # EWMA speed in px/s
+        self.velocity = RunningStats()
+        self.baseline = None       # (mean, std) of the flowing speed once learned
+        self.cusum = 0.0
+        self.onset = None          # (timestamp, temperature) where the CUSUM last left zero
+        self.event = None
+
+    def add(self, timestamp, center, temperature=None):
+        """Feed one frame's centre; returns a ClotEvent the first time cessation is detected"""
+        if self.event is not None or center is None:
+            return None
+        if self.anchor_time is None:
+            self.start_time = self.anchor_time = timestamp
+            self.anchor_center = center
+            return None
+        dt = timestamp - self.anchor_time
+        if dt < self.interval:
+            return None
+
+        speed = math.hypot(center[0] - self.anchor_center[0], center[1] - self.anchor_center[1]) / dt
+        self.anchor_time = timestamp
+        self.anchor_center = center
+        self.samples += 1
+        self.speed += self.alpha * (speed - self.speed)
+
+        if self.baseline is None:
+            self.velocity.add(speed)
+            if self.velocity.n >= self.baseline_samples:
+                if self.velocity.mean >= self.min_speed:
+                    # Floor the spread so a very steady flow does not alarm on one slow interval
+                    std = max(self.velocity.std, 0.25 * self.velocity.mean)
+                    self.baseline = (self.velocity.mean, std)
+                else:
+                    # Not flowing yet; keep learning from fresh samples
+                    self.velocity = RunningStats()
+            return None
+
+        # Lower one-sided CUSUM: accumulates while speed stays below mean * (1 - drift)
+        mean, std = self.baseline
+        self.cusum = max(0.0, self.cusum + (mean * (1 - self.drift) - speed) / std)
+        if self.cusum == 0.0 or self.onset is None:
+            self.onset = (timestamp, temperature)
+        if self.cusum > self.cusum_threshold:
+            onset_time, onset_temp = self.onset
+            self.event = ClotEvent(self.rig_id, onset_time, onset_time - self.start_time,
+                                   onset_temp, timestamp)
+            return self.event
+        return None
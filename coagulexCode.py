@@ -1,139 +1,54 @@
 # Fixed version of CoagulexApp with separate tracking states for each camera
 # This resolves the issue where both cameras were sharing the same tracking variables
 
-import serial
+import os
+import queue
 import threading
-import matplotlib.pyplot as plt
-from matplotlib.figure import Figure
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-import matplotlib.dates as mdates
 from datetime import datetime, timedelta
-import numpy as np
-import cv2 as cv
-import tkinter as tk
-from tkinter import *
-from PIL import Image, ImageTk
 import time
 from collections import deque
-import ttkbootstrap as ttk
-from ttkbootstrap import Style
-from ttkbootstrap.constants import *
-
-class CameraTracker:
-    """Separate tracking state class for each camera"""
-    def __init__(self, camera_id):
-        self.camera_id = camera_id
-        
-        # Individual tracking variables for this camera
-        self.tracked_contour = None
-        self.last_drawn_contour = None
-        self.last_drawn_center = None
-        self.last_contour_update_time = time.time()
-        self.prev_center = None
-        self.total_distance = 0
-        self.tracking_locked = False
-        
-        # Tracking parameters
-        self.CONTOUR_UPDATE_INTERVAL = 0.3
-        self.DISTANCE_THRESHOLD = 2.5
-    
-    def get_center(self, contour):
-        """Calculate center of contour"""
-        x, y, w, h = cv.boundingRect(contour)
-        return (x + w // 2, y + h // 2)
-    
-    def contours_similar(self, c1, c2, pos_thresh=50, area_thresh=0.3):
-        """Check if two contours are similar"""
-        cx1, cy1 = self.get_center(c1)
-        cx2, cy2 = self.get_center(c2)
-        pos_dist = np.sqrt((cx1 - cx2) ** 2 + (cy1 - cy2) ** 2)
-        a1 = cv.contourArea(c1)
-        a2 = cv.contourArea(c2)
-        area_ratio = min(a1, a2) / max(a1, a2) if max(a1, a2) > 0 else 0
-        return pos_dist < pos_thresh and area_ratio > (1 - area_thresh)
-    
-    def process_contours(self, frame):
-        """Process contours for this specific camera tracker"""
-        # Contour detection and tracking logic
-        gray = cv.cvtColor(frame, cv.COLOR_BGR2GRAY)
-        blurred = cv.GaussianBlur(gray, (5, 5), 0)
-        edges = cv.Canny(blurred, 100, 200)
-        contours, _ = cv.findContours(edges, cv.RETR_EXTERNAL, cv.CHAIN_APPROX_SIMPLE)
-
-        current_contour = None
-
-        if contours:
-            if not self.tracking_locked:
-                # If not locked, find the largest contour
-                self.tracked_contour = max(contours, key=cv.contourArea)
-                self.tracking_locked = True
-                current_contour = self.tracked_contour
-            else:
-                for contour in contours:
-                    if self.contours_similar(self.tracked_contour, contour):
-                        current_contour = contour
-                        self.tracked_contour = contour
-                        break
-
-        current_time = time.time()
-        update = False
-
-        if current_contour is not None and (current_time - self.last_contour_update_time) >= self.CONTOUR_UPDATE_INTERVAL:
-            current_center = self.get_center(current_contour)
-            if self.last_drawn_center is None:
-                # First update ever
-                update = True
-            else:
-                # Check if the contour has moved significantly
-                dx = current_center[0] - self.last_drawn_center[0]
-                dy = current_center[1] - self.last_drawn_center[1]
-                dist_moved = np.sqrt(dx ** 2 + dy ** 2)
-                
-                update = dist_moved >= self.DISTANCE_THRESHOLD
-
-            if update:
-                # Update the contour and center used for drawing
-                self.last_drawn_contour = current_contour
-                self.last_drawn_center = current_center
-
-                # Update distance traveled total
-                if self.prev_center is not None:
-                    dy_total = self.last_drawn_center[1] - self.prev_center[1]
-                    self.total_distance += dy_total
-
-                self.prev_center = self.last_drawn_center
-                self.last_contour_update_time = current_time
-
-        # Draw the last updated contour and center on every frame
-        if self.last_drawn_contour is not None and self.last_drawn_center is not None:
-            cv.drawContours(frame, [self.last_drawn_contour], -1, (0, 255, 0), 2)
-            cv.circle(frame, self.last_drawn_center, 5, (0, 0, 255), -1)
-
-        # Add camera ID to the display
-        cv.putText(frame, f"Camera {self.camera_id} - Distance: {self.total_distance:.2f}px", 
-                   (10, 30), cv.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2)
-
-        return frame
-    
-    def reset_tracking(self):
-        """Reset all tracking variables for this camera"""
-        self.tracked_contour = None
-        self.last_drawn_contour = None
-        self.last_drawn_center = None
-        self.prev_center = None
-        self.total_distance = 0
-        self.tracking_locked = False
+import tkinter as tk
+from tkinter import ttk as tkttk
+
+# Heavy modules are bound by load_heavy_modules() on a background thread, so the
+# window appears before matplotlib, OpenCV, ttkbootstrap, PIL and pyserial load.
+serial = np = cv = ttk = Style = None
+Figure = FigureCanvasTkAgg = mdates = Image = ImageTk = None
+RigRegistry = tile_columns = None
+
+# Plot colours per rig, cycled past eight rigs
+RIG_COLORS = ['#00ffff', '#ff6b6b', '#7CFC00', '#ffd700', '#da70d6', '#ffa500', '#87cefa', '#f08080']
+
+def load_heavy_modules():
+    """Import the GUI, plotting, vision and serial modules into this module's globals"""
+    global serial, np, cv, ttk, Style, Figure, FigureCanvasTkAgg, mdates, Image, ImageTk, RigRegistry, tile_columns
+    import numpy as np
+    import cv2 as cv
+    from PIL import Image, ImageTk
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+    import matplotlib.dates as mdates
+    import ttkbootstrap as ttk
+    from ttkbootstrap import Style
+    import serial
+    from rig import RigRegistry, tile_columns
 
 def quantize_grayscale(image, levels=4):
     """Reduce grayscale image to a limited number of levels."""
-    step = 256 // levels
-    quantized = (image // step) * step
-    return quantized.astype(np.uint8)
+    from grayLut import apply_gray_lut
+    return apply_gray_lut(image, levels=levels)
 
 def binarize_image(gray, reference_darkness=20):
-    """Threshold image: pixels darker than reference become black (0), all else white (255)."""
-    _, binary = cv.threshold(gray, reference_darkness, 255, cv.THRESH_BINARY_INV)
-    return binary
+    """Threshold image: pixels at or below reference become white (255), all else black (0)."""
+    from grayLut import apply_gray_lut
+    return apply_gray_lut(gray, threshold=reference_darkness, invert=True)
+
+class TempSnapshot:
+    """Immutable copy of the temperature buffers, published by the serial thread"""
+    def __init__(self, seq=0, times=(), temps=None):
+        self.seq = seq
+        self.times = times        # tuple of datetimes
+        self.temps = temps or {}  # {rig_id: tuple of temperatures aligned with times}
 
 class CoagulexApp:
     def __init__(self, root):
@@ -141,35 +56,112 @@ class CoagulexApp:
         self.root.title("Coagulex - Advanced Temperature & Motion Monitor")
         self.root.state('zoomed')  # Fullscreen
 
-        # Premium theme styling
-        self.style = Style(theme="darkly")  # Premium dark theme
-        self.root.configure(bg=self.style.colors.bg)
-
-        # Data buffers
+        # Data buffers; per-rig temperatures live on each rig, aligned with these times
         self.BUFFER_SIZE = 100
-        self.temps = deque(maxlen=self.BUFFER_SIZE)
-        self.temps2 = deque(maxlen=self.BUFFER_SIZE)
         self.times = deque(maxlen=self.BUFFER_SIZE)
+        self.NUM_RIGS = int(os.environ.get('COAGULEX_RIGS', '2'))
+        self.SYNC_MODE = os.environ.get('COAGULEX_SYNC', 'timestamp')  # 'timestamp', 'grab' or 'none'
+        self.SYNC_TOLERANCE = 0.02  # seconds
+        self.WELLS = {}  # {rig_id: [(x, y, w, h), ...]} to track a cartridge of wells with one camera
+        # {rig_id: board channel n of the Tn field} for rigs not on their own channel (several rigs may
+        # share one), or None to track without temperature gating; the CPCA board only prints T1 and T2
+        self.TEMP_CHANNELS = {}
+        # {rig_id: {setting: value}} capture mode per rig, using rig.CaptureConfig's arguments, e.g.
+        # {1: {'width': 1280, 'height': 720, 'grayscale': True, 'decode_scale': 2}}; unlisted rigs use the defaults
+        self.CAPTURE_CONFIGS = {}
 
         # Serial & tracking parameters
-        self.SERIAL_PORT = 'COM3'
+        self.SERIAL_PORT = os.environ.get('COAGULEX_SERIAL_PORT', 'COM3')  # Point at serialSimulator.py's pty to test without a board
         self.BAUD_RATE = 115200
         self.TEMP_THRESHOLD = 37.0
-        self.ready_to_track = False
-        self.lock = threading.Lock()
+        self.lock = threading.Lock()  # serialises writers of the buffers; readers use self.snapshot
+        self.snapshot = TempSnapshot()
+        self.drawn_seq = 0
+        self.missing_channels = set()  # channels already warned about
 
         # Control states
         self.running = True
         self.monitoring_active = True
 
-        # SOLUTION: Create separate tracker instances for each camera
-        self.camera1_tracker = CameraTracker(camera_id=1)
-        self.camera2_tracker = CameraTracker(camera_id=2)
+        # Status messages from background threads, applied on the Tk thread
+        self.status_queue = queue.Queue()
+        self.status_labels = {}
+
+        self.show_splash()
+        threading.Thread(target=self.load_modules, daemon=True).start()
+
+    def show_splash(self):
+        """Lightweight loading screen built only from stdlib tkinter"""
+        self.splash = tk.Frame(self.root, bg='#222222')
+        self.splash.place(relx=0, rely=0, relwidth=1, relheight=1)
+        tk.Label(self.splash, text="COAGULEX", font=("Segoe UI", 28, "bold"),
+                 fg='#375a7f', bg='#222222').pack(expand=True, anchor="s", pady=(0, 10))
+        self.splash_msg = tk.Label(self.splash, text="Loading modules...", font=("Segoe UI", 11),
+                                   fg='white', bg='#222222')
+        self.splash_msg.pack()
+        self.splash_bar = tkttk.Progressbar(self.splash, mode="indeterminate", length=300)
+        self.splash_bar.pack(expand=True, anchor="n", pady=10)
+        self.splash_bar.start(15)
+
+    def load_modules(self):
+        """Background thread: import heavy modules, then hand over to the Tk thread"""
+        try:
+            load_heavy_modules()
+        except Exception as e:
+            msg = f"Startup failed: {e}"
+            self.root.after(0, lambda: self.splash_msg.config(text=msg))
+            return
+        self.root.after(0, self.finish_startup)
+
+    def finish_startup(self):
+        """Build the full UI once modules are loaded; devices keep opening in the background"""
+        # Premium theme styling
+        self.style = Style(theme="darkly")  # Premium dark theme
+        self.root.configure(bg=self.style.colors.bg)
+
+        # Each rig owns its camera, tracker, temperature channel and display tile
+        from rig import CaptureConfig
+        capture_configs = {rig_id: CaptureConfig(**settings) for rig_id, settings in self.CAPTURE_CONFIGS.items()}
+        self.rigs = RigRegistry(self.NUM_RIGS, buffer_size=self.BUFFER_SIZE, capture_configs=capture_configs,
+                                wells=self.WELLS, temp_channels=self.TEMP_CHANNELS)
+        # Trajectories spill to this run's session store once their buffers fill
+        from trajectory import new_session_dir
+        self.session_dir = new_session_dir()
+        # Per-rig settings: defaults overlaid with each rig's saved profile
+        from configStore import ConfigStore, TRACKER_PARAMS
+        self.config_store = ConfigStore()
+        for rig in self.rigs:
+            rig.configure(self.config_store.load(
+                rig.rig_id,
+                {'threshold': self.TEMP_THRESHOLD, 'HYSTERESIS': rig.HYSTERESIS, 'PREVIEW_FPS': rig.PREVIEW_FPS},
+                {name: getattr(rig.tracker, name) for name in TRACKER_PARAMS}))
+            for name, target in self.sample_names(rig):
+                target.trajectory.spill_path = os.path.join(self.session_dir, f"{name}_trajectory.bin")
+            rig.recorder.directory = os.path.join(self.session_dir, "clips")
 
         self.setup_ui()
+        self.splash_bar.stop()
+        self.splash.destroy()
+
         self.setup_video()
         self.start_serial_monitoring()
         self.start_updates()
+        self.process_status_updates()
+
+    def post_status(self, key, text, bootstyle="light"):
+        """Queue a device status update; safe to call from any thread"""
+        self.status_queue.put((key, text, bootstyle))
+
+    def process_status_updates(self):
+        while True:
+            try:
+                key, text, bootstyle = self.status_queue.get_nowait()
+            except queue.Empty:
+                break
+            label = self.status_labels.get(key)
+            if label is not None:
+                label.config(text=text, bootstyle=bootstyle)
+        self.root.after(100, self.process_status_updates)
 
     def setup_ui(self):
         # Configure grid weights
@@ -203,9 +195,11 @@ class CoagulexApp:
         self.ax.set_ylabel("Temperature (°C)", color='white')
         self.ax.grid(True, alpha=0.3)
 
-        # Temperature lines
-        self.line1, = self.ax.plot([], [], '-', label="Sensor 1 (°C)", color='#00ffff', linewidth=2)
-        self.line2, = self.ax.plot([], [], '-', label="Sensor 2 (°C)", color='#ff6b6b', linewidth=2)
+        # Temperature lines, one per rig
+        for rig in self.rigs:
+            label = f"Sensor {rig.temp_channel} (°C)" if rig.gated else f"Rig {rig.rig_id} (ungated)"
+            rig.line, = self.ax.plot([], [], '-', label=label,
+                                     color=RIG_COLORS[(rig.rig_id - 1) % len(RIG_COLORS)], linewidth=2)
         self.ax.legend(facecolor='#2c2c2c', edgecolor='white', labelcolor='white')
 
         self.canvas = FigureCanvasTkAgg(self.fig, master=graph_frame)
@@ -213,12 +207,12 @@ class CoagulexApp:
         self.canvas_widget.pack(fill="both", expand=True)
 
     def setup_video_frame(self):
-        """Setup video frame with optimized layout for dual feeds"""
+        """Setup video frame with one tile per rig"""
         video_frame = ttk.Frame(self.root, bootstyle="dark", padding=15)
         video_frame.grid(row=0, column=1, sticky="nsew", padx=(5, 10), pady=20)
 
         # Video title
-        ttk.Label(video_frame, text="Live Motion Tracking - Dual Feed", 
+        ttk.Label(video_frame, text=f"Live Motion Tracking - {len(self.rigs)} Rigs",
                 bootstyle="info", font=("Segoe UI", 14, "bold")).pack(pady=(0, 10))
 
         # Container for video feeds
@@ -226,23 +220,20 @@ class CoagulexApp:
         video_container.pack(fill="both", expand=True)
 
         # Configure container grid weights for equal distribution
-        video_container.grid_rowconfigure(0, weight=1)
-        video_container.grid_rowconfigure(1, weight=1)
-        video_container.grid_columnconfigure(0, weight=1)
+        cols = tile_columns(len(self.rigs))
+        rows = (len(self.rigs) + cols - 1) // cols
+        for r in range(rows):
+            video_container.grid_rowconfigure(r, weight=1)
+        for c in range(cols):
+            video_container.grid_columnconfigure(c, weight=1)
 
-        # Video feed 1 with label
-        feed1_frame = ttk.LabelFrame(video_container, text="Camera 1", bootstyle="primary")
-        feed1_frame.grid(row=0, column=0, sticky="nsew", padx=5, pady=5)
-        
-        self.video_label1 = ttk.Label(feed1_frame, background='#1c1c1c')
-        self.video_label1.pack(fill="both", expand=True, padx=5, pady=5)
+        for i, rig in enumerate(self.rigs):
+            feed_frame = ttk.LabelFrame(video_container, text=f"Camera {rig.rig_id}",
+                                        bootstyle="primary" if i % 2 == 0 else "secondary")
+            feed_frame.grid(row=i // cols, column=i % cols, sticky="nsew", padx=5, pady=5)
 
-        # Video feed 2 with label
-        feed2_frame = ttk.LabelFrame(video_container, text="Camera 2", bootstyle="secondary")
-        feed2_frame.grid(row=1, column=0, sticky="nsew", padx=5, pady=5)
-        
-        self.video_label2 = ttk.Label(feed2_frame, background='#1c1c1c')
-        self.video_label2.pack(fill="both", expand=True, padx=5, pady=5)
+            rig.video_label = ttk.Label(feed_frame, background='#1c1c1c')
+            rig.video_label.pack(fill="both", expand=True, padx=5, pady=5)
 
     def setup_control_panel(self):
         control_frame = ttk.Frame(self.root, bootstyle="dark", padding=(20, 30))
@@ -263,30 +254,24 @@ class CoagulexApp:
         status_frame = ttk.LabelFrame(control_frame, text="System Status", bootstyle="info", padding=15)
         status_frame.pack(fill="x", pady=(0, 20))
 
-        ttk.Label(status_frame, text="Temperature Sensor 1:", bootstyle="light", 
-                 font=("Segoe UI", 10)).pack(anchor="w")
-        self.temp1_val = ttk.Label(status_frame, text="-- °C", font=("Segoe UI", 14, "bold"), 
-                                  bootstyle="success")
-        self.temp1_val.pack(anchor="w", pady=(0, 10))
-
-        ttk.Label(status_frame, text="Temperature Sensor 2:", bootstyle="light", 
-                 font=("Segoe UI", 10)).pack(anchor="w")
-        self.temp2_val = ttk.Label(status_frame, text="-- °C", font=("Segoe UI", 14, "bold"), 
-                                  bootstyle="warning")
-        self.temp2_val.pack(anchor="w", pady=(0, 10))
-
-        # SOLUTION: Display motion data for both cameras separately
-        ttk.Label(status_frame, text="Camera 1 Motion:", bootstyle="light", 
-                 font=("Segoe UI", 10)).pack(anchor="w")
-        self.distance1_val = ttk.Label(status_frame, text="0.00 px", font=("Segoe UI", 12, "bold"), 
-                                      bootstyle="info")
-        self.distance1_val.pack(anchor="w", pady=(0, 5))
-
-        ttk.Label(status_frame, text="Camera 2 Motion:", bootstyle="light", 
-                 font=("Segoe UI", 10)).pack(anchor="w")
-        self.distance2_val = ttk.Label(status_frame, text="0.00 px", font=("Segoe UI", 12, "bold"), 
-                                      bootstyle="info")
-        self.distance2_val.pack(anchor="w")
+        # One row per rig: temperature, motion and camera state
+        headers = ("Rig", "Temp", "Motion", "Camera")
+        for col, header in enumerate(headers):
+            ttk.Label(status_frame, text=header, bootstyle="light",
+                      font=("Segoe UI", 10)).grid(row=0, column=col, sticky="w", padx=(0, 10))
+        for row, rig in enumerate(self.rigs, start=1):
+            ttk.Label(status_frame, text=str(rig.rig_id), bootstyle="light",
+                      font=("Segoe UI", 10, "bold")).grid(row=row, column=0, sticky="w")
+            rig.temp_label = ttk.Label(status_frame, text="-- °C", font=("Segoe UI", 11, "bold"),
+                                       bootstyle="success")
+            rig.temp_label.grid(row=row, column=1, sticky="w", padx=(0, 10))
+            rig.distance_label = ttk.Label(status_frame, text="0.00 px", font=("Segoe UI", 11, "bold"),
+                                           bootstyle="info")
+            rig.distance_label.grid(row=row, column=2, sticky="w", padx=(0, 10))
+            rig.camera_label = ttk.Label(status_frame, text="waiting...", bootstyle="secondary",
+                                         font=("Segoe UI", 10))
+            rig.camera_label.grid(row=row, column=3, sticky="w")
+            self.status_labels[f"rig{rig.rig_id}"] = rig.camera_label
 
         # Control buttons
         control_buttons = ttk.LabelFrame(control_frame, text="Controls", bootstyle="primary", padding=15)
@@ -304,71 +289,157 @@ class CoagulexApp:
                                   command=self.save_data, bootstyle="success-outline", width=15)
         self.save_btn.pack(pady=5, fill="x")
 
+        self.clip_btn = ttk.Button(control_buttons, text="Save Clip",
+                                   command=self.save_clips, bootstyle="info-outline", width=15)
+        self.clip_btn.pack(pady=5, fill="x")
+
+        # Device status, filled in as cameras and serial open in the background
+        devices_frame = ttk.LabelFrame(control_frame, text="Devices", bootstyle="info", padding=15)
+        devices_frame.pack(fill="x", pady=(0, 20))
+
+        row = ttk.Frame(devices_frame)
+        row.pack(fill="x")
+        ttk.Label(row, text="Serial:", bootstyle="light", font=("Segoe UI", 10)).pack(side="left")
+        self.status_labels["serial"] = ttk.Label(row, text="waiting...", bootstyle="secondary",
+                                                 font=("Segoe UI", 10))
+        self.status_labels["serial"].pack(side="right")
+
+        row = ttk.Frame(devices_frame)
+        row.pack(fill="x")
+        ttk.Label(row, text="Camera skew:", bootstyle="light", font=("Segoe UI", 10)).pack(side="left")
+        self.skew_label = ttk.Label(row, text="--", bootstyle="secondary", font=("Segoe UI", 10))
+        self.skew_label.pack(side="right")
+
         # Threshold settings
         threshold_frame = ttk.LabelFrame(control_frame, text="Settings", bootstyle="secondary", padding=15)
         threshold_frame.pack(fill="x")
 
+        # One value for every rig, or a comma-separated value per rig
         ttk.Label(threshold_frame, text="Temp Threshold (°C):", bootstyle="light").pack(anchor="w")
-        self.threshold_var = tk.StringVar(value=str(self.TEMP_THRESHOLD))
+        thresholds = [f"{rig.threshold:g}" for rig in self.rigs]
+        self.threshold_var = tk.StringVar(value=thresholds[0] if len(set(thresholds)) == 1 else ", ".join(thresholds))
         threshold_entry = ttk.Entry(threshold_frame, textvariable=self.threshold_var, width=10)
         threshold_entry.pack(anchor="w", pady=(0, 10))
+        threshold_entry.bind("<Return>", lambda event: self.update_threshold())
+        ttk.Button(threshold_frame, text="Apply Threshold",
+                   command=self.update_threshold, bootstyle="info-outline").pack(fill="x")
+
+        # Show a tracker pipeline stage in the camera tiles instead of the frame
+        from debugTaps import TAP_NAMES
+        ttk.Label(threshold_frame, text="Debug view:", bootstyle="light").pack(anchor="w", pady=(10, 0))
+        self.debug_view_var = tk.StringVar(value="off")
+        debug_view = ttk.Combobox(threshold_frame, textvariable=self.debug_view_var,
+                                  values=("off",) + TAP_NAMES, state="readonly", width=12)
+        debug_view.pack(anchor="w")
+        debug_view.bind("<<ComboboxSelected>>", lambda event: self.update_debug_view())
 
     def setup_video(self):
-        """Initialize both video capture devices with consistent naming"""
-        self.vidCap1 = cv.VideoCapture(0)
-        self.vidCap2 = cv.VideoCapture(1)
-
-        if not self.vidCap1.isOpened():
-            print("Warning: Could not open webcam 0.")
-        if not self.vidCap2.isOpened():
-            print("Warning: Could not open webcam 1.")
+        """Discover the rig cameras in the background; each rig opens its own device"""
+        for rig in self.rigs:
+            self.post_status(f"rig{rig.rig_id}", "discovering...", "warning")
+        threading.Thread(target=self.discover_cameras, daemon=True).start()
+
+    def discover_cameras(self):
+        """Map cached or freshly probed devices to rigs and start their workers"""
+        from cameraDiscovery import CameraDiscovery
+        try:
+            discovery = CameraDiscovery()
+            discovery.discover()
+            devices = {rig: info["path"] for rig, info in discovery.rigs().items()}
+        except Exception as e:
+            print(f"Warning: camera discovery failed: {e}")
+            devices = {}
+        self.rigs.start(devices, on_status=lambda rig_id, text, bootstyle:
+                        self.post_status(f"rig{rig_id}", text, bootstyle),
+                        sync=self.SYNC_MODE, tolerance=self.SYNC_TOLERANCE)
 
     def start_serial_monitoring(self):
         threading.Thread(target=self.serial_reader, daemon=True).start()
 
     def serial_reader(self):
+        self.post_status("serial", "connecting...", "warning")
         try:
             ser = serial.Serial(self.SERIAL_PORT, self.BAUD_RATE, timeout=1)
+            self.post_status("serial", self.SERIAL_PORT, "success")
             while True:
                 if ser.in_waiting:
                     line = ser.readline().decode(errors='ignore').strip()
                     print("Serial:", line)
-                    try:
-                        t1, t2 = self.parse_serial_line(line)
-                        with self.lock:
-                            current_time = datetime.now()
-                            self.temps.append(t1)
-                            self.temps2.append(t2)
-                            self.times.append(current_time)
-
-                            if t1 >= self.TEMP_THRESHOLD:
-                                self.ready_to_track = True
-                    except Exception as e:
-                        print(f"Parsing error: {e}")
+                    self.handle_serial_line(line)
         except Exception as e:
             print(f"Serial connection error: {e}")
             # Use simulated data if serial fails
+            self.post_status("serial", "simulated", "danger")
             self.simulate_data()
 
+    def handle_serial_line(self, line):
+        """Parse one board line and append it to each rig's temperature buffer"""
+        try:
+            channels = self.parse_serial_line(line)
+        except Exception as e:
+            print(f"Parsing error: {e}")
+            return
+
+        with self.lock:
+            self.times.append(datetime.now())
+            for rig in self.rigs:
+                # Keep every rig aligned with self.times even if its channel is missing
+                temp = channels.get(rig.temp_channel, float('nan')) if rig.gated else float('nan')
+                if temp != temp and rig.gated and rig.temp_channel not in self.missing_channels:
+                    self.missing_channels.add(rig.temp_channel)
+                    print(f"Warning: board line has no T{rig.temp_channel} for rig {rig.rig_id}; it will not "
+                          f"start tracking until it does (see TEMP_CHANNELS)")
+                rig.temps.append(temp)
+                rig.update_temperature(temp)
+            self.publish_snapshot()
+
+    def publish_snapshot(self):
+        """Replace the snapshot readers see; call with self.lock held.
+
+        The renderer grabs self.snapshot without locking, so ingest never waits
+        on a redraw. Rebinding one attribute is atomic.
+        """
+        self.snapshot = TempSnapshot(self.snapshot.seq + 1, tuple(self.times),
+                                     {rig.rig_id: tuple(rig.temps) for rig in self.rigs})
+
+    def simulate_data(self):
+        """Fallback simulation if serial connection fails"""
+        from serialSimulator import synthesize_lines, BOARD_LINE_INTERVAL
+        for line in synthesize_lines():
+            if not self.running:
+                break
+            if self.monitoring_active:
+                self.handle_serial_line(line)
+            time.sleep(BOARD_LINE_INTERVAL)
+
     def parse_serial_line(self, line):
-        parts = line.split()
-        t1 = next(part.split(":")[1] for part in parts if part.startswith("T1:"))
-        t2 = next(part.split(":")[1] for part in parts if part.startswith("T2:"))
-        return float(t1), float(t2)
+        """Return {channel: temperature} for every Tn:value field in a board line"""
+        channels = {}
+        for part in line.split():
+            name, sep, value = part.partition(":")
+            if sep and name[:1] == "T" and name[1:].isdigit():
+                channels[int(name[1:])] = float(value)
+        if not channels:
+            raise ValueError(f"no temperature fields in {line!r}")
+        return channels
 
     def start_updates(self):
         self.update_plot()
         self.update_video()
+        self.root.after(1000, self.check_profiles)
 
     def update_plot(self):
         if self.monitoring_active:
-            with self.lock:
-                if self.times:
-                    self.line1.set_data(self.times, self.temps)
-                    self.line2.set_data(self.times, self.temps2)
+            snapshot = self.snapshot
+            if snapshot.times:
+                # Only redraw the graph when new samples arrived
+                if snapshot.seq != self.drawn_seq:
+                    self.drawn_seq = snapshot.seq
+                    for rig in self.rigs:
+                        rig.line.set_data(snapshot.times, snapshot.temps[rig.rig_id])
                     self.ax.set_ylim(5, 50)
 
-                    max_time = self.times[-1]
+                    max_time = snapshot.times[-1]
                     min_time = max_time - timedelta(seconds=60)
                     self.ax.set_xlim(min_time, max_time)
                     self.ax.xaxis.set_major_formatter(mdates.DateFormatter('%H:%M:%S'))
@@ -378,92 +449,180 @@ class CoagulexApp:
                     self.ax.autoscale_view(scaley=True)
                     self.canvas.draw()
 
-                    # Update temperature displays
-                    if self.temps and self.temps2:
-                        self.temp1_val.config(text=f"{self.temps[-1]:.2f} °C")
-                        self.temp2_val.config(text=f"{self.temps2[-1]:.2f} °C")
-
-                    # SOLUTION: Update distance displays for both cameras separately
-                    self.distance1_val.config(text=f"{self.camera1_tracker.total_distance:.2f} px")
-                    self.distance2_val.config(text=f"{self.camera2_tracker.total_distance:.2f} px")
+                # Update temperature and distance displays per rig
+                for rig in self.rigs:
+                    temps = snapshot.temps[rig.rig_id]
+                    if temps and temps[-1] == temps[-1]:  # skip NaN
+                        rig.temp_label.config(text=f"{temps[-1]:.2f} °C")
+                    events = [event for event in rig.clot_events if event is not None]
+                    if len(rig.clot_events) == 1 and events:
+                        rig.distance_label.config(text=f"clot {events[0].elapsed:.1f} s", bootstyle="danger")
+                    elif events:
+                        rig.distance_label.config(text=f"{len(events)}/{len(rig.clot_events)} clotted",
+                                                  bootstyle="danger")
+                    elif rig.tracker.calibration is not None:
+                        rig.distance_label.config(text=f"{rig.tracker.total_distance_mm:.2f} mm")
+                    else:
+                        rig.distance_label.config(text=f"{rig.tracker.total_distance:.2f} px")
+                    if rig.running and rig.source is not None and rig.source.grabbed:
+                        rejected = rig.tracker.quality_gate.skip_rate()
+                        rig.camera_label.config(text=f"{rig.state}, {rig.fps:.0f} fps, {rig.frames_skipped()} skipped, "
+                                                     f"{rejected:.0%} low quality")
+
+                # Inter-camera skew of the aligned frame sets
+                sync = self.rigs.synchronizer
+                if sync is not None and sync.stats.mean is not None:
+                    self.skew_label.config(text=f"{sync.stats.mean * 1000:.1f} ms (max {sync.stats.max * 1000:.1f})")
 
         self.root.after(500, self.update_plot)
         
     def update_video(self):
-        """SOLUTION: Update both video feeds with separate tracker processing"""
-        # Process first video feed with camera1_tracker
-        if hasattr(self, 'vidCap1') and self.vidCap1.isOpened():
-            ret1, frame1 = self.vidCap1.read()
-        else:
-            ret1, frame1 = False, None
+        """Show the latest processed frame of each rig; capture and tracking run on the rig workers"""
+        for rig in self.rigs:
+            if rig.display_seq == rig.shown_seq or rig.display_frame is None:
+                continue
+            rig.shown_seq = rig.display_seq
+            imgtk = ImageTk.PhotoImage(image=Image.fromarray(rig.display_frame))
+            rig.video_label.imgtk = imgtk
+            rig.video_label.config(image=imgtk)
 
-        # Process second video feed with camera2_tracker
-        if hasattr(self, 'vidCap2') and self.vidCap2.isOpened():
-            ret2, frame2 = self.vidCap2.read()
-        else:
-            ret2, frame2 = False, None
+        self.root.after(30, self.update_video)
 
-        # Display first video feed with independent tracking
-        if ret1:
-            if self.monitoring_active:
-                # SOLUTION: Use camera1_tracker for independent processing
-                frame1 = self.camera1_tracker.process_contours(frame1.copy())
-            frame1 = cv.resize(frame1, (640, 360))  # Resize for better fit
-            frame1 = cv.cvtColor(frame1, cv.COLOR_BGR2RGB)
-            img1 = Image.fromarray(frame1)
-            imgtk1 = ImageTk.PhotoImage(image=img1)
-            self.video_label1.imgtk = imgtk1
-            self.video_label1.config(image=imgtk1)
-
-        # Display second video feed with independent tracking
-        if ret2:
-            if self.monitoring_active:
-                # SOLUTION: Use camera2_tracker for independent processing
-                frame2 = self.camera2_tracker.process_contours(frame2.copy())
-            frame2 = cv.resize(frame2, (640, 360))  # Resize for better fit
-            frame2 = cv.cvtColor(frame2, cv.COLOR_BGR2RGB)
-            img2 = Image.fromarray(frame2)
-            imgtk2 = ImageTk.PhotoImage(image=img2)
-            self.video_label2.imgtk = imgtk2
-            self.video_label2.config(image=imgtk2)
+    def update_threshold(self):
+        """Apply the threshold entry: one value for all rigs or one per rig"""
+        try:
+            values = [float(v) for v in self.threshold_var.get().replace(";", ",").split(",") if v.strip()]
+        except ValueError:
+            print("Invalid threshold value")
+            return
+        if not values:
+            return
+        # Every value is checked before any profile is written, so a bad entry changes no rig
+        from configStore import check_value
+        try:
+            values = [check_value('threshold', v, self.TEMP_THRESHOLD) for v in values]
+        except ValueError as e:
+            print(f"Invalid threshold value: {e}")
+            return
+        # Profiles are written outside self.lock so serial ingest never waits on the disk
+        configs = []
+        for i, rig in enumerate(self.rigs):
+            value = values[i] if i < len(values) else values[-1]
+            try:
+                self.config_store.update(rig.rig_id, rig={'threshold': value})
+            except OSError as e:
+                # The config is published before it is saved, so the rig still takes the new value
+                print(f"Warning: could not save rig {rig.rig_id} profile: {e}")
+            configs.append(self.config_store.get(rig.rig_id))
+        with self.lock:
+            for config in configs:
+                self.rigs[config.rig_id].configure(config)
+        for config in configs:
+            print(f"Rig {config.rig_id} threshold updated to {config.rig['threshold']}°C")
+        self.TEMP_THRESHOLD = values[0]
+
+    def check_profiles(self):
+        """Apply rig profiles edited on disk while running"""
+        if not self.running:
+            return
+        try:
+            changed = self.config_store.reload_changed()
+            if changed:
+                with self.lock:
+                    for config in changed:
+                        self.rigs[config.rig_id].configure(config)
+        except Exception as e:
+            print(f"Warning: applying rig profiles failed: {e}")
+        finally:
+            self.root.after(1000, self.check_profiles)
 
-        self.root.after(30, self.update_video)
+    def update_debug_view(self):
+        name = self.debug_view_var.get()
+        for rig in self.rigs:
+            rig.set_debug_view(None if name == "off" else name)
 
     def toggle_monitoring(self):
         self.monitoring_active = not self.monitoring_active
+        for rig in self.rigs:
+            rig.tracking_active = self.monitoring_active
         if self.monitoring_active:
             self.start_btn.config(text="Pause Monitoring", bootstyle="warning")
         else:
             self.start_btn.config(text="Resume Monitoring", bootstyle="success")
 
+    def save_clips(self):
+        """Save the last seconds of every camera, and the next few, as operator clips"""
+        for rig in self.rigs:
+            if rig.source is not None:
+                rig.recorder.trigger('operator')
+
     def reset_data(self):
-        """SOLUTION: Reset data for both temperature and tracking systems"""
+        """Reset temperature and tracking data for every rig"""
         with self.lock:
-            self.temps.clear()
-            self.temps2.clear()
             self.times.clear()
-        
-        # Reset both camera trackers independently
-        self.camera1_tracker.reset_tracking()
-        self.camera2_tracker.reset_tracking()
-        
+            for rig in self.rigs:
+                rig.reset()
+            self.publish_snapshot()
+
         # Update displays
-        self.distance1_val.config(text="0.00 px")
-        self.distance2_val.config(text="0.00 px")
-        self.temp1_val.config(text="-- °C")
-        self.temp2_val.config(text="-- °C")
+        for rig in self.rigs:
+            rig.distance_label.config(text="0.00 px", bootstyle="info")
+            rig.temp_label.config(text="-- °C")
+
+    def sample_names(self, rig):
+        """(name, target) for each sample a rig tracks: one per camera, or one per well"""
+        targets = rig.tracker.targets()
+        if len(targets) == 1 and targets[0] is rig.tracker:
+            return [(f"rig{rig.rig_id}", rig.tracker)]
+        return [(f"rig{rig.rig_id}_well{target.index}", target) for target in targets]
 
     def save_data(self):
-        """SOLUTION: Save data including both camera tracking information"""
-        with self.lock:
-            if self.times and self.temps and self.temps2:
-                filename = f"coagulex_log_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
-                with open(filename, "w") as f:
-                    f.write("Time,Temperature_1,Temperature_2,Camera1_Distance,Camera2_Distance\n")
-                    for t, t1, t2 in zip(self.times, self.temps, self.temps2):
-                        f.write(f"{t.strftime('%Y-%m-%d %H:%M:%S')},{t1:.2f},{t2:.2f},"
-                               f"{self.camera1_tracker.total_distance:.2f},{self.camera2_tracker.total_distance:.2f}\n")
-                print(f"Data saved to {filename}")
+        """Save temperatures with each sample's displacement at that time, plus per-frame trajectories"""
+        snapshot = self.snapshot
+        if not snapshot.times:
+            return
+        times, temps = snapshot.times, snapshot.temps
+        rigs = list(self.rigs)
+        trajectories = {}
+        calibrations = {}
+        for rig in rigs:
+            with rig.lock:
+                for name, target in self.sample_names(rig):
+                    trajectories[name] = target.trajectory.to_array()
+                    calibrations[name] = (rig.tracker.calibration, rig.tracker.frame_size)
+
+        # Vertical displacement from the first tracked centre, sampled at each temperature time;
+        # in millimetres from undistorted centres when the camera is calibrated
+        stamps = np.array([t.timestamp() for t in times])
+        distances = {}
+        for name, traj in trajectories.items():
+            valid = traj[~np.isnan(traj['y'])]
+            calibration, frame_size = calibrations[name]
+            if not len(valid):
+                d = np.full(len(stamps), np.nan)
+            elif calibration is not None:
+                y = calibration.to_mm(np.column_stack([valid['x'], valid['y']]), frame_size)[:, 1]
+                d = np.interp(stamps, valid['t'], y - y[0], left=np.nan)
+            else:
+                d = np.interp(stamps, valid['t'], valid['y'] - valid['y'][0], left=np.nan)
+            unit = "mm" if calibration is not None else "px"
+            distances[f"{name}_Distance_{unit}"] = d
+
+        base = f"coagulex_log_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        with open(f"{base}.csv", "w") as f:
+            f.write("Time," + ",".join(f"Temperature_{rig.rig_id}" for rig in rigs) + "," +
+                    ",".join(distances) + "\n")
+            for i, t in enumerate(times):
+                row_temps = ",".join(f"{temps[rig.rig_id][i]:.2f}" for rig in rigs)
+                row_distances = ",".join(f"{d[i]:.2f}" for d in distances.values())
+                f.write(f"{t.strftime('%Y-%m-%d %H:%M:%S')},{row_temps},{row_distances}\n")
+
+        for name, traj in trajectories.items():
+            if len(traj):
+                np.savetxt(f"{base}_{name}_trajectory.csv", traj, delimiter=",",
+                           fmt=("%.3f", "%.2f", "%.2f", "%.1f", "%.3f"),
+                           header=",".join(traj.dtype.names), comments="")
+        print(f"Data saved to {base}.csv")
 
 # Launch the application
 if __name__ == '__main__':
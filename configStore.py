@@ -0,0 +1,195 @@
+# Versioned per-rig settings with hot-reload
+# Each rig's settings are an immutable RigConfig: serial-gate values for the rig
+# and tuning values for its tracker. A change builds a new RigConfig with the
+# next version number and swaps the reference, so readers never see a half-
+# applied update. Rigs take the new gate values at once and hand the tracker
+# values to their worker, which applies them between frames without dropping the
+# lock. Only the values changed from the defaults are persisted, one JSON
+# profile per rig, and loaded again at startup; editing a profile on disk while
+# the GUI runs applies it too.
+
+import json
+import os
+from types import MappingProxyType
+
+PROFILE_DIR = "profiles"
+
+# Gate settings on the Rig, applied from the serial/Tk side
+RIG_PARAMS = ('threshold', 'HYSTERESIS', 'PREVIEW_FPS')
+# Tracker settings, applied by the rig's worker between frames
+TRACKER_PARAMS = (
+    'CONTOUR_UPDATE_INTERVAL', 'DISTANCE_THRESHOLD', 'CENTER_MODE',
+    'BLUR_KERNEL', 'CANNY_LOW', 'CANNY_HIGH', 'POS_THRESH', 'AREA_THRESH',
+    'SEGMENTATION', 'LUT_LEVELS', 'LUT_THRESHOLD', 'LUT_STRETCH', 'MIN_COMPONENT_AREA',
+    'USE_MOTION_GATE', 'USE_QUALITY_GATE', 'DISPLACEMENT_MODE',
+    'PHASE_SCALE', 'PHASE_MARGIN', 'PHASE_MIN_RESPONSE', 'PHASE_MAX_SHIFT', 'PHASE_REANCHOR_INTERVAL',
+)
+
+
+# Allowed values for string settings
+CHOICES = {
+    'SEGMENTATION': ('canny', 'threshold', 'components'),
+    'CENTER_MODE': ('bbox', 'moments'),
+    'DISPLACEMENT_MODE': ('contour', 'phase'),
+}
+# Inclusive (lowest, highest) for numeric settings, None for no bound
+RANGES = {
+    'threshold': (0, 100), 'HYSTERESIS': (0, 20), 'PREVIEW_FPS': (0.1, 60),
+    'CONTOUR_UPDATE_INTERVAL': (0, 60), 'DISTANCE_THRESHOLD': (0, None),
+    'BLUR_KERNEL': (1, 99), 'CANNY_LOW': (0, 1000), 'CANNY_HIGH': (0, 1000),
+    'POS_THRESH': (1, None), 'AREA_THRESH': (0.01, 1),
+    'LUT_LEVELS': (2, 256), 'LUT_THRESHOLD': (0, 255), 'MIN_COMPONENT_AREA': (0, None),
+    'PHASE_SCALE': (1, 16), 'PHASE_MARGIN': (0, 512), 'PHASE_MIN_RESPONSE': (0, 1),
+    'PHASE_MAX_SHIFT': (0.01, 1), 'PHASE_REANCHOR_INTERVAL': (0, 600),
+}
+# Types of settings whose default is None (off)
+OPTIONAL_TYPES = {'LUT_LEVELS': int, 'LUT_STRETCH': tuple}
+
+
+def profile_path(rig_id, directory=PROFILE_DIR):
+    return os.path.join(directory, f"rig{rig_id}.json")
+
+
+def check_value(name, value, default):
+    """value converted to the type of default, or ValueError if it is the wrong type or out of range"""
+    kind = OPTIONAL_TYPES.get(name, type(default))
+    if value is None and name in OPTIONAL_TYPES:
+        return None
+    if kind is bool:
+        if not isinstance(value, bool):
+            raise ValueError(f"{name} must be true or false, got {value!r}")
+    elif kind is int:
+        if isinstance(value, float) and value.is_integer():
+            value = int(value)
+        if isinstance(value, bool) or not isinstance(value, int):
+            raise ValueError(f"{name} must be an integer, got {value!r}")
+    elif kind is float:
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise ValueError(f"{name} must be a number, got {value!r}")
+        value = float(value)
+    elif kind is str:
+        if value not in CHOICES.get(name, (value,)) or not isinstance(value, str):
+            raise ValueError(f"{name} must be one of {', '.join(CHOICES[name])}, got {value!r}")
+    elif name == 'LUT_STRETCH':
+        if (not isinstance(value, (list, tuple)) or len(value) != 2 or
+                not all(isinstance(v, int) and not isinstance(v, bool) and 0 <= v <= 255 for v in value) or
+                value[0] >= value[1]):
+            raise ValueError(f"LUT_STRETCH must be null or [lo, hi] grey levels with lo < hi, got {value!r}")
+        return tuple(value)
+
+    lo, hi = RANGES.get(name, (None, None))
+    if (lo is not None and not value >= lo) or (hi is not None and not value <= hi):
+        raise ValueError(f"{name} must be between {lo} and {hi}, got {value!r}")
+    if name == 'BLUR_KERNEL' and value % 2 == 0:
+        raise ValueError(f"BLUR_KERNEL must be odd, got {value!r}")
+    return value
+
+
+def check_params(params, allowed, defaults):
+    """Validated copy of params, each converted to the type of its default"""
+    checked = {}
+    for name, value in params.items():
+        if name not in allowed:
+            raise ValueError(f"unknown setting {name!r} (one of {', '.join(allowed)})")
+        checked[name] = check_value(name, value, defaults.get(name))
+    return checked
+
+
+class RigConfig:
+    """Immutable settings snapshot for one rig"""
+    def __init__(self, rig_id, version, rig, tracker, overrides):
+        self.rig_id = rig_id
+        self.version = version
+        self.rig = MappingProxyType(dict(rig))
+        self.tracker = MappingProxyType(dict(tracker))
+        self.overrides = MappingProxyType({'rig': dict(overrides['rig']), 'tracker': dict(overrides['tracker'])})
+
+
+class ConfigStore:
+    """Current RigConfig per rig, with profiles persisted under directory"""
+    def __init__(self, directory=PROFILE_DIR):
+        self.directory = directory
+        self.defaults = {}  # rig_id -> {'rig': {...}, 'tracker': {...}}
+        self.configs = {}   # rig_id -> RigConfig; replaced, never mutated
+        self.mtimes = {}    # rig_id -> profile mtime last loaded or written
+        self.version = 0
+
+    def get(self, rig_id):
+        return self.configs.get(rig_id)
+
+    def load(self, rig_id, rig_defaults, tracker_defaults):
+        """Config for a rig from its defaults and stored profile, if any"""
+        self.defaults[rig_id] = {'rig': {name: rig_defaults[name] for name in RIG_PARAMS},
+                                 'tracker': {name: tracker_defaults[name] for name in TRACKER_PARAMS}}
+        overrides = {'rig': {}, 'tracker': {}}
+        path = profile_path(rig_id, self.directory)
+        if os.path.exists(path):
+            try:
+                with open(path) as f:
+                    data = json.load(f)
+                overrides = self.checked_overrides(rig_id, data.get('rig', {}), data.get('tracker', {}))
+                self.mtimes[rig_id] = os.path.getmtime(path)
+                print(f"Rig {rig_id}: loaded profile {path}")
+            except (OSError, ValueError) as e:
+                print(f"Warning: ignoring unreadable profile {path}: {e}")
+        return self.publish(rig_id, overrides)
+
+    def update(self, rig_id, rig=None, tracker=None):
+        """New config with these values changed; persisted and returned"""
+        current = self.configs[rig_id].overrides
+        changes = self.checked_overrides(rig_id, rig or {}, tracker or {})
+        overrides = {'rig': {**current['rig'], **changes['rig']},
+                     'tracker': {**current['tracker'], **changes['tracker']}}
+        config = self.publish(rig_id, overrides)
+        self.save(rig_id)
+        return config
+
+    def reload_changed(self):
+        """Configs for rigs whose profile changed on disk since it was last read or written"""
+        changed = []
+        for rig_id in list(self.configs):
+            path = profile_path(rig_id, self.directory)
+            try:
+                mtime = os.path.getmtime(path)
+            except OSError:
+                continue
+            if mtime == self.mtimes.get(rig_id):
+                continue
+            self.mtimes[rig_id] = mtime
+            try:
+                with open(path) as f:
+                    data = json.load(f)
+                overrides = self.checked_overrides(rig_id, data.get('rig', {}), data.get('tracker', {}))
+            except (OSError, ValueError) as e:
+                print(f"Warning: keeping current settings, profile {path} is invalid: {e}")
+                continue
+            changed.append(self.publish(rig_id, overrides))
+            print(f"Rig {rig_id}: reloaded profile {path}")
+        return changed
+
+    def checked_overrides(self, rig_id, rig, tracker):
+        defaults = self.defaults[rig_id]
+        return {'rig': check_params(rig, RIG_PARAMS, defaults['rig']),
+                'tracker': check_params(tracker, TRACKER_PARAMS, defaults['tracker'])}
+
+    def publish(self, rig_id, overrides):
+        defaults = self.defaults[rig_id]
+        self.version += 1
+        config = RigConfig(rig_id, self.version, {**defaults['rig'], **overrides['rig']},
+                           {**defaults['tracker'], **overrides['tracker']}, overrides)
+        self.configs = {**self.configs, rig_id: config}
+        return config
+
+    def save(self, rig_id):
+        """Write the rig's non-default settings, replacing the profile atomically"""
+        config = self.configs[rig_id]
+        path = profile_path(rig_id, self.directory)
+        os.makedirs(self.directory, exist_ok=True)
+        tmp = path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump({'version': config.version,
+                       'rig': dict(config.overrides['rig']),
+                       'tracker': {name: list(value) if isinstance(value, tuple) else value
+                                   for name, value in config.overrides['tracker'].items()}}, f, indent=2)
+        os.replace(tmp, path)
+        self.mtimes[rig_id] = os.path.getmtime(path)
@@ -0,0 +1,54 @@
+# Named debug taps on the tracking pipeline
+# The tracker offers its intermediate images (gray, blurred, edges, mask,
+# candidates) at fixed points. Nothing is copied, converted or drawn unless a
+# viewer has subscribed to that tap; with no subscribers a tap is a single dict
+# truthiness check. Subscribers run on the tracking thread and must treat the
+# image as read-only.
+
+import cv2 as cv
+
+TAP_NAMES = ('gray', 'blurred', 'edges', 'mask', 'candidates')
+
+
+class Taps:
+    """Subscription registry for one tracker's pipeline stages"""
+    def __init__(self):
+        # Replaced, never mutated, so the tracking thread can read it without a lock
+        self.subscribers = {}  # name -> tuple of callbacks(name, image)
+
+    def subscribe(self, name, callback):
+        if name not in TAP_NAMES:
+            raise ValueError(f"unknown tap {name!r} (one of {', '.join(TAP_NAMES)})")
+        subscribers = dict(self.subscribers)
+        subscribers[name] = subscribers.get(name, ()) + (callback,)
+        self.subscribers = subscribers
+
+    def unsubscribe(self, name, callback):
+        subscribers = dict(self.subscribers)
+        remaining = tuple(cb for cb in subscribers.get(name, ()) if cb != callback)
+        if remaining:
+            subscribers[name] = remaining
+        else:
+            subscribers.pop(name, None)
+        self.subscribers = subscribers
+
+    def watching(self, name):
+        return name in self.subscribers
+
+    def emit(self, name, image):
+        """Hand image to the tap's subscribers; callers check watching() first for costly images"""
+        for callback in self.subscribers.get(name, ()):
+            callback(name, image)
+
+
+def draw_candidates(blurred, detections, tracked_contour=None):
+    """BGR view of every candidate in grey, and the tracked one in green"""
+    view = cv.cvtColor(blurred, cv.COLOR_GRAY2BGR)
+    if hasattr(detections, 'boxes'):
+        for x, y, w, h in detections.boxes:
+            cv.rectangle(view, (int(x), int(y)), (int(x + w), int(y + h)), (160, 160, 160), 1)
+    else:
+        cv.drawContours(view, list(detections), -1, (160, 160, 160), 1)
+    if tracked_contour is not None:
+        cv.drawContours(view, [tracked_contour], -1, (0, 255, 0), 2)
+    return view
@@ -0,0 +1,118 @@
+# Frame quality gate in front of segmentation
+# Motion blur, auto-exposure swings and bubbles make the tracker latch onto the
+# wrong contour and pay for a re-lock later. Each frame is scored on a small
+# grayscale copy: Laplacian variance for focus, and a coarse histogram for
+# brightness and clipping. All three scores are compared with running averages,
+# so the thresholds adapt to each camera's scene instead of needing absolute
+# values; a dark sample filling the view is normal for that camera, not clipping.
+# Only accepted frames move the averages; a lasting change (a lamp switched on,
+# refocusing) is adopted once the new level has held for hold_frames rejected
+# frames in a row, so a short blip or swing never shifts the baseline.
+
+import numpy as np
+import cv2 as cv
+
+
+class QualityGate:
+    """Rejects blurred, clipped or exposure-jumped frames before they reach segmentation"""
+    def __init__(self, scale=4, min_sharpness=0.5, max_exposure_jump=25, max_clipped=0.25,
+                 alpha=0.05, hold_frames=15, warmup=10):
+        self.scale = scale                          # downscale factor for scoring
+        self.min_sharpness = min_sharpness          # fraction of the running focus score a frame must reach
+        self.max_exposure_jump = max_exposure_jump  # grey levels the mean may move from its running value
+        self.max_clipped = max_clipped              # fraction of pixels the darkest + brightest bins may gain over their running value
+        self.alpha = alpha                          # running average rate, updated from accepted frames
+        self.hold_frames = hold_frames              # consecutive steady rejects before their level becomes the baseline
+        self.warmup = warmup                        # frames accepted unconditionally to learn the averages
+
+        self.sharpness = None
+        self.brightness = None
+        self.clipped = None
+        self.run_reason = None  # reason shared by the current run of consecutive rejects
+        self.run_frames = 0
+        self.run_sharpness = 0.0
+        self.run_brightness = 0.0
+        self.run_clipped = 0.0
+        self.frames_checked = 0
+        self.frames_skipped = 0
+        self.skipped_by = {'blur': 0, 'exposure': 0, 'clipped': 0}
+        self.last_score = None
+
+    def score(self, frame):
+        """(sharpness, mean brightness, clipped fraction) of a downscaled grayscale copy"""
+        h, w = frame.shape[:2]
+        small = cv.resize(frame, (max(w // self.scale, 1), max(h // self.scale, 1)), interpolation=cv.INTER_AREA)
+        if small.ndim == 3:
+            small = cv.cvtColor(small, cv.COLOR_BGR2GRAY)
+        sharpness = cv.Laplacian(small, cv.CV_32F).var()
+        hist = cv.calcHist([small], [0], None, [32], [0, 256]).ravel()
+        total = max(hist.sum(), 1)
+        brightness = float(np.dot(hist, np.arange(4, 256, 8)) / total)
+        clipped = float((hist[0] + hist[-1]) / total)
+        return float(sharpness), brightness, clipped
+
+    def accept(self, frame):
+        """True if the frame is usable; rejected frames do not move the running averages"""
+        sharpness, brightness, clipped = self.last_score = self.score(frame)
+        self.frames_checked += 1
+        if self.sharpness is None:
+            self.sharpness = sharpness
+            self.brightness = brightness
+            self.clipped = clipped
+            return True
+
+        reason = None
+        if self.frames_checked > self.warmup:
+            if clipped > self.clipped + self.max_clipped:
+                reason = 'clipped'
+            elif abs(brightness - self.brightness) > self.max_exposure_jump:
+                reason = 'exposure'
+            elif sharpness < self.min_sharpness * self.sharpness:
+                reason = 'blur'
+        if reason is not None and self.hold(reason, sharpness, brightness, clipped):
+            reason = None
+        if reason is not None:
+            self.frames_skipped += 1
+            self.skipped_by[reason] += 1
+            return False
+
+        self.run_reason = None
+        self.sharpness += self.alpha * (sharpness - self.sharpness)
+        self.brightness += self.alpha * (brightness - self.brightness)
+        self.clipped += self.alpha * (clipped - self.clipped)
+        return True
+
+    def hold(self, reason, sharpness, brightness, clipped):
+        """Track the run of rejects; True once a steady new level has held long enough to adopt"""
+        steady = (reason == self.run_reason and
+                  abs(brightness - self.run_brightness) <= self.max_exposure_jump / 2 and
+                  sharpness >= self.min_sharpness * self.run_sharpness and
+                  abs(clipped - self.run_clipped) <= self.max_clipped / 2)
+        if not steady:
+            self.run_reason = reason
+            self.run_frames = 0
+            self.run_sharpness = self.run_brightness = self.run_clipped = 0.0
+        self.run_frames += 1
+        self.run_sharpness += (sharpness - self.run_sharpness) / self.run_frames
+        self.run_brightness += (brightness - self.run_brightness) / self.run_frames
+        self.run_clipped += (clipped - self.run_clipped) / self.run_frames
+        if self.run_frames < self.hold_frames:
+            return False
+        # The scene has changed for good: the run's level is the new baseline
+        self.sharpness = self.run_sharpness
+        self.brightness = self.run_brightness
+        self.clipped = self.run_clipped
+        self.run_reason = None
+        return True
+
+    def skip_rate(self):
+        return self.frames_skipped / self.frames_checked if self.frames_checked else 0.0
+
+    def reset(self):
+        self.sharpness = None
+        self.brightness = None
+        self.clipped = None
+        self.run_reason = None
+        self.frames_checked = 0
+        self.frames_skipped = 0
+        self.skipped_by = {reason: 0 for reason in self.skipped_by}
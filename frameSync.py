@@ -0,0 +1,209 @@
+# Multi-camera frame synchronisation
+# Groups frames from several rigs' cameras into aligned sets so clot timing can be
+# compared across rigs with a known, measured inter-camera skew.
+#
+# Two strategies:
+#   GrabSynchronizer       one thread calls grab() on every device back to back and
+#                          only then retrieve(), so exposures are as close together
+#                          as the hardware allows
+#   TimestampSynchronizer  each camera keeps its own capture thread; frames are
+#                          matched by capture timestamp within a tolerance window
+# Both feed each rig's FrameSource as usual (display, recorder) and hand FrameSets
+# to listeners; the rig registry delivers each set's frames to the rig workers
+# through a FrameSlot, so every tracker processes the frame of the same set.
+# Rigs previewing at a low rate are not held to the others: they get sets of
+# their own, and only full-rate rigs are matched with each other.
+
+import threading
+import time
+from collections import deque
+
+
+class FrameSet:
+    """Frames from several cameras taken at (nearly) the same moment"""
+    def __init__(self, seq, frames, timestamps):
+        self.seq = seq
+        self.frames = frames          # {rig_id: frame}
+        self.timestamps = timestamps  # {rig_id: capture time}
+        self.skew = max(timestamps.values()) - min(timestamps.values())
+        self.timestamp = sum(timestamps.values()) / len(timestamps)
+
+
+class FrameSlot:
+    """Latest synchronised frame for one rig's worker; frames replaced before being taken are skipped"""
+    def __init__(self):
+        self.cond = threading.Condition()
+        self.item = None
+        self.skipped = 0
+        self.closed = False
+
+    def put(self, frame, timestamp, set_seq, skew):
+        with self.cond:
+            if self.item is not None:
+                self.skipped += 1
+            self.item = (frame, timestamp, set_seq, skew)
+            self.cond.notify_all()
+
+    def get(self, timeout=1.0):
+        """(frame, set timestamp, set seq, set skew), or all None on timeout or close"""
+        with self.cond:
+            self.cond.wait_for(lambda: self.item is not None or self.closed, timeout)
+            item, self.item = self.item, None
+        return item if item is not None else (None, None, None, None)
+
+    def close(self):
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+
+
+class SkewStats:
+    """Running inter-camera skew statistics in seconds"""
+    def __init__(self, alpha=0.05):
+        self.alpha = alpha
+        self.last = 0.0
+        self.mean = None
+        self.max = 0.0
+        self.sets = 0
+
+    def add(self, skew):
+        self.last = skew
+        self.mean = skew if self.mean is None else self.mean + self.alpha * (skew - self.mean)
+        self.max = max(self.max, skew)
+        self.sets += 1
+
+
+class GrabSynchronizer:
+    """Owns several open FrameSources and captures them in lockstep"""
+    def __init__(self, sources):
+        self.sources = sources  # {rig_id: FrameSource}, already open, not started
+        self.listeners = []     # called as listener(frame_set) on the capture thread
+        self.stats = SkewStats()
+        self.seq = 0
+        self.running = False
+        self.thread = None
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self.capture_loop, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+
+    def capture_loop(self):
+        while self.running:
+            # Grab everything first: grab() only latches the frame, which is cheap
+            grabbed = {}
+            for rig_id, source in self.sources.items():
+                if source.cap.grab():
+                    grabbed[rig_id] = time.time()
+            if not grabbed:
+                time.sleep(0.005)
+                continue
+
+            # Then do the slow part, decoding, for each latched frame
+            frames = {}
+            for rig_id in grabbed:
+                if not self.sources[rig_id].due(grabbed[rig_id]):
+                    continue
+                source = self.sources[rig_id]
+                try:
+                    ret, frame = source.retrieve()
+                except Exception as e:
+                    # A bad frame from one camera must not stop capture for every rig
+                    source.errors += 1
+                    if source.errors == 1 or source.errors % 100 == 0:
+                        print(f"Camera {source.path}: frame failed ({source.errors} so far): {e}")
+                    continue
+                if ret:
+                    frames[rig_id] = frame
+            timestamps = {rig_id: grabbed[rig_id] for rig_id in frames}
+            for rig_id, frame in frames.items():
+                self.sources[rig_id].publish(frame, timestamps[rig_id])
+
+            # Rigs previewing at a low rate only join a set when they decode
+            if frames:
+                self.seq += 1
+                frame_set = FrameSet(self.seq, frames, timestamps)
+                if len(frames) > 1:
+                    self.stats.add(frame_set.skew)
+                for listener in self.listeners:
+                    listener(frame_set)
+
+        for source in self.sources.values():
+            source.release()
+
+
+class TimestampSynchronizer:
+    """Matches frames from independently captured sources by capture timestamp"""
+    def __init__(self, sources, tolerance=0.02, history=8, stale=0.5):
+        self.sources = sources      # {rig_id: FrameSource}
+        self.tolerance = tolerance  # seconds; sets with more skew are not emitted
+        self.stale = stale          # seconds without a frame before a camera stops holding up the others
+        self.listeners = []
+        self.stats = SkewStats()
+        self.seq = 0
+        self.dropped = 0
+        self.first_time = None      # first frame seen; cameras yet to deliver count as live until stale after it
+        self.lock = threading.Lock()
+        self.buffers = {rig_id: deque(maxlen=history) for rig_id in sources}
+        self.ids = {id(source): rig_id for rig_id, source in sources.items()}
+        for source in sources.values():
+            source.listeners.append(self.on_frame)
+
+    def on_frame(self, source, frame, timestamp):
+        """Listener on each source's capture thread"""
+        rig_id = self.ids[id(source)]
+        with self.lock:
+            if self.first_time is None:
+                self.first_time = timestamp
+            if source.min_interval > 0:
+                # Previewing: pass the frame straight on rather than hold full-rate rigs to it
+                self.buffers[rig_id].clear()
+                self.seq += 1
+                frame_set = FrameSet(self.seq, {rig_id: frame}, {rig_id: timestamp})
+            else:
+                self.buffers[rig_id].append((timestamp, frame))
+                frame_set = self.match()
+        if frame_set is not None:
+            for listener in self.listeners:
+                listener(frame_set)
+
+    def match(self):
+        """Emit a set around the newest time every full-rate camera has reached, if within tolerance"""
+        newest = max((buffer[-1][0] for buffer in self.buffers.values() if buffer), default=None)
+        if newest is None:
+            return None
+        buffers = {rig_id: buffer for rig_id, buffer in self.buffers.items()
+                   if self.sources[rig_id].min_interval == 0 and
+                   (buffer or (self.sources[rig_id].last_publish or self.first_time) >= newest - self.stale)}
+        if not all(buffers.values()):
+            return None
+        reference = min(buffer[-1][0] for buffer in buffers.values())
+        chosen = {rig_id: min(buffer, key=lambda entry: abs(entry[0] - reference))
+                  for rig_id, buffer in buffers.items()}
+        times = [entry[0] for entry in chosen.values()]
+        if max(times) - min(times) > self.tolerance:
+            # Drop the frame furthest behind so the next attempt can realign
+            laggard = min(buffers, key=lambda rig_id: buffers[rig_id][0][0])
+            buffers[laggard].popleft()
+            self.dropped += 1
+            return None
+
+        # Consume everything up to and including the chosen frames
+        for rig_id, (ts, _) in chosen.items():
+            buffer = buffers[rig_id]
+            while buffer and buffer[0][0] <= ts:
+                buffer.popleft()
+        self.seq += 1
+        frame_set = FrameSet(self.seq, {rig_id: entry[1] for rig_id, entry in chosen.items()},
+                             {rig_id: entry[0] for rig_id, entry in chosen.items()})
+        if len(chosen) > 1:
+            self.stats.add(frame_set.skew)
+        return frame_set
+
+    def stop(self):
+        for source in self.sources.values():
+            if self.on_frame in source.listeners:
+                source.listeners.remove(self.on_frame)
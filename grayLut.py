@@ -0,0 +1,38 @@
+# Single-pass grayscale lookup tables
+# Contrast stretch, quantization and binarization are all per-pixel functions of
+# the grey level, so they compose into one 256-entry table applied with cv.LUT
+# instead of separate full-array passes.
+
+from functools import lru_cache
+
+import numpy as np
+import cv2 as cv
+
+
+@lru_cache(maxsize=32)
+def build_gray_lut(levels=None, threshold=None, invert=True, stretch=None):
+    """Build a uint8 LUT: optional stretch (lo, hi) -> quantize to levels -> binarize at threshold.
+
+    Binarization follows cv.threshold: with invert=True pixels <= threshold become
+    255 (THRESH_BINARY_INV), otherwise pixels > threshold become 255.
+    """
+    x = np.arange(256, dtype=np.float32)
+    if stretch is not None:
+        lo, hi = stretch
+        x = np.clip((x - lo) * 255.0 / max(hi - lo, 1), 0, 255)
+    x = np.round(x).astype(np.int32)
+    if levels:
+        step = 256 // levels
+        x = (x // step) * step
+    if threshold is not None:
+        above = x > threshold
+        x = np.where(above != invert, 255, 0)
+    lut = x.astype(np.uint8)
+    lut.setflags(write=False)
+    return lut
+
+
+def apply_gray_lut(gray, levels=None, threshold=None, invert=True, stretch=None):
+    """Apply the fused stretch/quantize/binarize table to a grayscale image"""
+    stretch = tuple(stretch) if stretch is not None else None
+    return cv.LUT(gray, build_gray_lut(levels, threshold, invert, stretch))
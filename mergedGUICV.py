@@ -1,23 +1,30 @@
 #This is the closest to a final version of the integrated GUI with CV tracking and serial reading.
 #Need to fix the contour tracking to iGUI.py and distance calculation to dispacement
 
-import serial
 import threading
-import matplotlib.pyplot as plt
-from matplotlib.figure import Figure
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-import matplotlib.dates as mdates
 from datetime import datetime, timedelta
-import numpy as np
-import cv2 as cv
 import tkinter as tk
 from tkinter import *
-from PIL import Image, ImageTk
 import time
 from collections import deque
-import ttkbootstrap as ttk
-from ttkbootstrap import Style
-from ttkbootstrap.constants import *
+
+# Heavy modules are bound by load_heavy_modules() on a background thread, so the
+# window appears before matplotlib, OpenCV, ttkbootstrap, PIL and pyserial load.
+serial = np = cv = ttk = Style = None
+Figure = FigureCanvasTkAgg = mdates = Image = ImageTk = None
+
+def load_heavy_modules():
+    """Import the GUI, plotting, vision and serial modules into this module's globals"""
+    global serial, np, cv, ttk, Style, Figure, FigureCanvasTkAgg, mdates, Image, ImageTk
+    import numpy as np
+    import cv2 as cv
+    from PIL import Image, ImageTk
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+    import matplotlib.dates as mdates
+    import ttkbootstrap as ttk
+    from ttkbootstrap import Style
+    import serial
 
 class CoagulexApp:
     def __init__(self, root):
@@ -25,10 +32,6 @@ class CoagulexApp:
         self.root.title("Coagulex - Advanced Temperature & Motion Monitor")
         self.root.state('zoomed')  # Fullscreen
 
-        # Premium theme styling
-        self.style = Style(theme="darkly")  # Premium dark theme
-        self.root.configure(bg=self.style.colors.bg)
-
         # Data buffers
         self.BUFFER_SIZE = 100
         self.temps = deque(maxlen=self.BUFFER_SIZE)
@@ -57,6 +60,28 @@ class CoagulexApp:
         self.CONTOUR_UPDATE_INTERVAL = 0.3
         self.DISTANCE_THRESHOLD = 2.5
 
+        self.splash = tk.Label(self.root, text="Loading modules...", font=("Segoe UI", 14),
+                               fg='white', bg='#222222')
+        self.splash.place(relx=0, rely=0, relwidth=1, relheight=1)
+        threading.Thread(target=self.load_modules, daemon=True).start()
+
+    def load_modules(self):
+        """Background thread: import heavy modules, then hand over to the Tk thread"""
+        try:
+            load_heavy_modules()
+        except Exception as e:
+            msg = f"Startup failed: {e}"
+            self.root.after(0, lambda: self.splash.config(text=msg))
+            return
+        self.root.after(0, self.finish_startup)
+
+    def finish_startup(self):
+        """Build the full UI once modules are loaded"""
+        # Premium theme styling
+        self.style = Style(theme="darkly")  # Premium dark theme
+        self.root.configure(bg=self.style.colors.bg)
+
+        self.splash.destroy()
         self.setup_ui()
         self.setup_video()
         self.start_serial_monitoring()
@@ -220,14 +245,16 @@ class CoagulexApp:
             print("Warning: Could not open webcam.")'''
     
     def setup_video(self):
-        """Initialize both video capture devices with consistent naming"""
-        self.vidCap1 = cv.VideoCapture(0)
-        self.vidCap2 = cv.VideoCapture(1)
-
-        if not self.vidCap1.isOpened():
-            print("Warning: Could not open webcam 0.")
-        if not self.vidCap2.isOpened():
-            print("Warning: Could not open webcam 1.")
+        """Open both video capture devices in the background so the window shows immediately"""
+        threading.Thread(target=self.open_camera, args=(0, 'vidCap1'), daemon=True).start()
+        threading.Thread(target=self.open_camera, args=(1, 'vidCap2'), daemon=True).start()
+
+    def open_camera(self, index, name):
+        cap = cv.VideoCapture(index)
+        if not cap.isOpened():
+            print(f"Warning: Could not open webcam {index}.")
+        # update_video skips the feed until the attribute exists
+        setattr(self, name, cap)
 
 
     def start_serial_monitoring(self):
@@ -0,0 +1,71 @@
+# Cheap motion gate in front of the contour pipeline
+# Compares a heavily downscaled grayscale copy of each frame against the keyframe
+# taken the last time the full pipeline ran. While the tracked region stays within
+# sensor noise of that keyframe, the tracker can reuse its previous result.
+# Comparing against the last keyframe rather than the previous frame means slow
+# drift still accumulates until it crosses the threshold, so gradual motion onset
+# is not missed.
+
+import time
+import numpy as np
+import cv2 as cv
+
+
+class MotionGate:
+    """Decides per frame whether the full tracking pipeline needs to run"""
+    def __init__(self, scale=8, pixel_thresh=10, min_changed=0.01, max_skip_s=1.0):
+        self.scale = scale                # downscale factor for the comparison frame
+        self.pixel_thresh = pixel_thresh  # grey-level change treated as real, above sensor noise
+        self.min_changed = min_changed    # fraction of ROI pixels that must change
+        self.max_skip_s = max_skip_s      # always run the full pipeline at least this often
+
+        self.reference = None
+        self.reference_time = None
+        self.frames_checked = 0
+        self.frames_skipped = 0
+
+    def small_gray(self, frame):
+        h, w = frame.shape[:2]
+        small = cv.resize(frame, (max(w // self.scale, 1), max(h // self.scale, 1)), interpolation=cv.INTER_AREA)
+        return small if small.ndim == 2 else cv.cvtColor(small, cv.COLOR_BGR2GRAY)
+
+    def needs_processing(self, frame, roi=None, timestamp=None):
+        """True if the frame differs from the keyframe inside roi (x, y, w, h in full-frame pixels).
+
+        roi may also be a list of regions, each judged on its own, so motion in one
+        small region is not diluted by a large static union of them.
+
+        When it returns True the frame becomes the new keyframe, on the assumption
+        that the caller then runs the full pipeline on it.
+        """
+        now = time.time() if timestamp is None else timestamp
+        small = self.small_gray(frame)
+        self.frames_checked += 1
+
+        changed = (self.reference is None or self.reference.shape != small.shape or
+                   now - self.reference_time >= self.max_skip_s)
+        if not changed:
+            rois = [None] if roi is None else roi if isinstance(roi, list) else [roi]
+            changed = any(self.region_changed(small, r) for r in rois)
+
+        if changed:
+            self.reference = small
+            self.reference_time = now
+        else:
+            self.frames_skipped += 1
+        return changed
+
+    def region_changed(self, small, roi):
+        region = (slice(None), slice(None))
+        if roi is not None:
+            x, y, w, h = (int(v) // self.scale for v in roi)
+            region = (slice(max(y, 0), y + h + 1), slice(max(x, 0), x + w + 1))
+        diff = cv.absdiff(small[region], self.reference[region])
+        return diff.size == 0 or np.count_nonzero(diff > self.pixel_thresh) > self.min_changed * diff.size
+
+    def skip_rate(self):
+        return self.frames_skipped / self.frames_checked if self.frames_checked else 0.0
+
+    def reset(self):
+        self.reference = None
+        self.reference_time = None
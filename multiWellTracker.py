@@ -0,0 +1,177 @@
+# Multi-well tracking: several samples per camera in one pass
+# A cartridge holds K samples in fixed well regions. The frame is segmented once
+# with the usual CameraTracker pipeline (contours or connected components), then
+# every candidate is matched to every well at once with array maths: inside-the-
+# well masks, distance and area-ratio gates against each well's tracked sample,
+# and a per-well argmin.
+# Each well keeps its own lock, displacement total and trajectory.
+# Only contour displacement is supported; phase correlation follows a single
+# anchored sample.
+
+import time
+import numpy as np
+import cv2 as cv
+
+from cameraTracker import CameraTracker, match_scores
+from trajectory import Trajectory
+
+
+class Well:
+    """Tracking state for one sample well"""
+    def __init__(self, index, rect):
+        self.index = index
+        self.rect = rect  # (x, y, w, h) in frame pixels
+        self.trajectory = Trajectory()
+        self.reset()
+
+    def reset(self):
+        self.tracking_locked = False
+        self.tracked_center = None
+        self.tracked_area = 0.0
+        self.current_contour = None
+        self.current_center = None
+        self.current_area = 0.0
+        self.current_confidence = 0.0
+        self.last_drawn_contour = None
+        self.last_drawn_center = None
+        self.last_contour_update_time = None
+        self.prev_center = None
+        self.total_distance = 0
+        self.total_distance_mm = 0.0
+        self.trajectory.clear()
+
+
+class MultiWellTracker(CameraTracker):
+    """Tracks one sample in each configured well of a single camera"""
+    def __init__(self, camera_id, wells):
+        super().__init__(camera_id)
+        self.wells = [Well(i + 1, tuple(rect)) for i, rect in enumerate(wells)]
+        self.rects = np.array([w.rect for w in self.wells], dtype=np.float64).reshape(-1, 4)
+        self.trajectory = None  # each well has its own
+
+    def targets(self):
+        return self.wells
+
+    def configure(self, params):
+        if params.get('DISPLACEMENT_MODE', 'contour') != 'contour':
+            raise ValueError("MultiWellTracker only supports DISPLACEMENT_MODE 'contour'")
+        super().configure(params)
+
+    def track(self, frame, timestamp=None):
+        if self.DISPLACEMENT_MODE != 'contour':
+            print(f"Camera {self.camera_id}: DISPLACEMENT_MODE {self.DISPLACEMENT_MODE!r} is not supported "
+                  f"with wells; using 'contour'")
+            self.DISPLACEMENT_MODE = 'contour'
+        super().track(frame, timestamp)
+
+    def assign(self, centers, areas):
+        """Index of the matching candidate for each well, or -1, plus match confidences.
+
+        centers is (N, 2) and areas (N,) for the frame's candidates.
+        """
+        k = len(self.wells)
+        if not len(areas) or not k:
+            return np.full(k, -1), np.zeros(k)
+
+        # (N, K) masks and costs
+        x0, y0, w, h = self.rects.T
+        cx, cy = centers[:, 0:1], centers[:, 1:2]
+        inside = (cx >= x0) & (cx < x0 + w) & (cy >= y0) & (cy < y0 + h)
+
+        locked = np.array([well.tracking_locked for well in self.wells])
+        prev = np.array([well.tracked_center if well.tracking_locked else (np.nan, np.nan)
+                         for well in self.wells], dtype=np.float64)
+        prev_area = np.array([well.tracked_area for well in self.wells], dtype=np.float64)
+        dist = np.hypot(cx - prev[:, 0], cy - prev[:, 1])
+        similar, match_cost, match_confidence = match_scores(dist, areas[:, None], prev_area,
+                                                             self.POS_THRESH, self.AREA_THRESH)
+
+        ok = inside & (~locked | similar)
+        # Locked wells take the closest similar contour; unlocked ones the largest inside them
+        cost = np.where(locked, match_cost, -areas[:, None])
+        cost = np.where(ok, cost, np.inf)
+
+        best = np.argmin(cost, axis=0)
+        cols = np.arange(k)
+        found = np.isfinite(cost[best, cols])
+        confidence = np.where(locked, match_confidence[best, cols], 1.0)
+        return np.where(found, best, -1), np.where(found, confidence, 0.0)
+
+    def update_tracking(self, contours, timestamp=None):
+        """Advance every well's lock and distance state with this frame's contours"""
+        centers = np.array([self.get_center(c) for c in contours], dtype=np.float64).reshape(-1, 2)
+        areas = np.array([cv.contourArea(c) for c in contours], dtype=np.float64)
+        self.advance_wells(centers, areas, lambda i: contours[i], timestamp)
+
+    def update_components(self, components, timestamp=None):
+        """Advance every well straight from the component arrays"""
+        self.advance_wells(components.centers(self.CENTER_MODE), components.areas, components.contour, timestamp)
+
+    def advance_wells(self, centers, areas, contour_of, timestamp=None):
+        """Assign candidates to wells and update each well; contour_of(i) gives candidate i's outline"""
+        current_time = time.time() if timestamp is None else timestamp
+        indices, confidences = self.assign(centers, areas)
+
+        for well, index, confidence in zip(self.wells, indices, confidences):
+            if index < 0:
+                well.current_contour = None
+                well.current_center = None
+                well.current_area = 0.0
+                well.current_confidence = 0.0
+                continue
+            contour = contour_of(index)
+            well.current_contour = contour
+            if self.CENTER_MODE == 'moments':
+                well.current_center = (float(centers[index, 0]), float(centers[index, 1]))
+            else:
+                well.current_center = (int(centers[index, 0]), int(centers[index, 1]))
+            well.current_area = float(areas[index])
+            well.current_confidence = float(confidence)
+            well.tracking_locked = True
+            well.tracked_center = well.current_center
+            well.tracked_area = well.current_area
+            self.update_distance(well, contour, current_time)
+
+        self.tracking_locked = any(well.tracking_locked for well in self.wells)
+        self.total_distance = float(np.mean([well.total_distance for well in self.wells])) if self.wells else 0
+        self.total_distance_mm = float(np.mean([well.total_distance_mm for well in self.wells])) if self.wells else 0.0
+
+    def gate_roi(self):
+        """The motion gate watches each well on its own; the pipeline runs if any of them changed"""
+        return [well.rect for well in self.wells]
+
+    def record(self, timestamp=None):
+        t = time.time() if timestamp is None else timestamp
+        for well in self.wells:
+            if well.current_center is None:
+                well.trajectory.append(t, np.nan, np.nan, 0.0, 0.0)
+            else:
+                well.trajectory.append(t, well.current_center[0], well.current_center[1],
+                                       well.current_area, well.current_confidence)
+
+    def draw(self, frame, scale=None):
+        """Draw each well's region, contour, centre and distance onto frame"""
+        sx, sy = scale or (1.0, 1.0)
+        font_scale = max(0.5 * sx, 0.35)
+        for well in self.wells:
+            x, y, w, h = well.rect
+            p0 = (int(round(x * sx)), int(round(y * sy)))
+            cv.rectangle(frame, p0, (int(round((x + w) * sx)), int(round((y + h) * sy))), (255, 255, 0), 1)
+            if well.last_drawn_contour is not None and well.last_drawn_center is not None:
+                points = np.round(well.last_drawn_contour.reshape(-1, 2) * (sx * 16, sy * 16)).astype(np.int32)
+                cv.polylines(frame, [points], True, (0, 255, 0), 2, cv.LINE_AA, shift=4)
+                cx, cy = well.last_drawn_center
+                cv.circle(frame, (int(round(cx * sx * 16)), int(round(cy * sy * 16))), int(round(4 * sx * 16)),
+                          (0, 0, 255), -1, cv.LINE_AA, shift=4)
+            cv.putText(frame, f"W{well.index}: {well.total_distance:.1f}px", (p0[0] + 3, p0[1] + 14),
+                       cv.FONT_HERSHEY_SIMPLEX, font_scale, (0, 0, 255), 1)
+        return frame
+
+    def reset_tracking(self):
+        """Reset every well and the shared motion gate"""
+        for well in self.wells:
+            well.reset()
+        self.tracking_locked = False
+        self.total_distance = 0
+        self.motion_gate.reset()
+        self.quality_gate.reset()
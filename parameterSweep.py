@@ -0,0 +1,336 @@
+# Parameter sweep engine for CameraTracker thresholds
+# Evaluates a grid of tracker settings over recorded clips and ranks them by
+# accuracy and per-frame cost, so we can pick the cheapest settings that still
+# meet accuracy.
+#
+# Shared stages are computed once and reused:
+#   - decoded grayscale frames per clip, cached on disk as .npy
+#   - blurred frames per (clip, BLUR_KERNEL), cached on disk as .npy
+#   - segmentation + findContours per (clip, BLUR_KERNEL, segmentation params),
+#     computed once per frame in a worker and fed to every tracker config in that group
+# Groups are spread over a process pool.
+#
+# Accuracy is measured against <clip>.truth.csv (columns t,total_distance) when
+# present, otherwise against the default CameraTracker settings.
+#
+# Usage:
+#   python parameterSweep.py clips/ --grid DISTANCE_THRESHOLD=1,2.5,4 --grid BLUR_KERNEL=3,5,7 \
+#       --grid CANNY_LOW=50,100 --grid CENTER_MODE=bbox,moments --tolerance 3 --out sweep.csv
+#   python parameterSweep.py clips/ --grid SEGMENTATION=canny,threshold,components   # compare backends
+
+import argparse
+import csv
+import hashlib
+import itertools
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from batchAnalysis import find_videos, DEFAULT_FPS
+
+# Parameters that the sweep knows how to vary, with the stage they belong to
+PREPROCESS_PARAMS = ('BLUR_KERNEL',)
+SEGMENT_PARAMS = ('SEGMENTATION', 'CANNY_LOW', 'CANNY_HIGH', 'LUT_LEVELS', 'LUT_THRESHOLD', 'MIN_COMPONENT_AREA')
+TRACK_PARAMS = ('CONTOUR_UPDATE_INTERVAL', 'DISTANCE_THRESHOLD', 'POS_THRESH', 'AREA_THRESH', 'CENTER_MODE')
+SWEEP_PARAMS = PREPROCESS_PARAMS + SEGMENT_PARAMS + TRACK_PARAMS
+
+
+def default_params():
+    """CameraTracker's built-in values for every sweepable parameter"""
+    from cameraTracker import CameraTracker
+    tracker = CameraTracker(camera_id=0)
+    return {name: getattr(tracker, name) for name in SWEEP_PARAMS}
+
+
+def expand_grid(grid):
+    """Cartesian product of a {name: [values]} grid over the default params"""
+    base = default_params()
+    for name in grid:
+        if name not in base:
+            raise ValueError(f"{name} is not a sweepable parameter ({', '.join(SWEEP_PARAMS)})")
+    names = list(grid)
+    for values in itertools.product(*(grid[name] for name in names)):
+        params = dict(base)
+        params.update(zip(names, values))
+        yield params
+
+
+def clip_cache_key(path, max_frames):
+    """Cache key that changes when the clip file or frame limit changes"""
+    stat = os.stat(path)
+    raw = f"{os.path.abspath(path)}|{stat.st_size}|{stat.st_mtime}|{max_frames}"
+    return hashlib.sha1(raw.encode()).hexdigest()[:16]
+
+
+def resize_frame_store(store, path, count, chunk=256):
+    """Copy the first count frames of a .npy memmap into a new one at path, a chunk at a time"""
+    resized = np.lib.format.open_memmap(path, mode='w+', dtype=store.dtype, shape=(count,) + store.shape[1:])
+    for i in range(0, min(count, len(store)), chunk):
+        j = min(i + chunk, count, len(store))
+        resized[i:j] = store[i:j]
+    return resized
+
+
+def build_clip_cache(path, kernels, cache_dir, max_frames=None):
+    """Decode a clip once and cache its grayscale and blurred frames.
+
+    Returns a dict with the cache file paths, fps and the measured per-frame cost
+    in ms of the grayscale conversion and of each blur kernel.
+    """
+    import cv2 as cv
+    cv.setNumThreads(1)
+
+    key = clip_cache_key(path, max_frames)
+    meta_path = os.path.join(cache_dir, f"{key}.json")
+    meta = {}
+    if os.path.exists(meta_path):
+        with open(meta_path) as f:
+            meta = json.load(f)
+
+    gray_path = os.path.join(cache_dir, f"{key}_gray.npy")
+    if not os.path.exists(gray_path) or 'gray_ms' not in meta:
+        cap = cv.VideoCapture(path)
+        if not cap.isOpened():
+            raise IOError(f"Could not open {path}")
+        meta['fps'] = cap.get(cv.CAP_PROP_FPS) or DEFAULT_FPS
+        # Frames go straight into an on-disk array sized from the container's frame
+        # count, so the clip never has to fit in RAM; the count is only a hint, so
+        # the array grows or is trimmed to what was actually decoded
+        capacity = max(int(cap.get(cv.CAP_PROP_FRAME_COUNT)), 1)
+        if max_frames is not None:
+            capacity = min(capacity, max_frames)
+        partial_path = os.path.join(cache_dir, f"{key}_gray.partial.npy")
+        store = None
+        count = 0
+        gray_time = 0.0
+        while max_frames is None or count < max_frames:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            start = time.perf_counter()
+            gray = cv.cvtColor(frame, cv.COLOR_BGR2GRAY)
+            gray_time += time.perf_counter() - start
+            if store is None:
+                store = np.lib.format.open_memmap(partial_path, mode='w+', dtype=np.uint8,
+                                                  shape=(capacity,) + gray.shape)
+            elif count == len(store):
+                grown_path = partial_path + ".grow.npy"
+                grown = resize_frame_store(store, grown_path, 2 * len(store))
+                del store
+                os.replace(grown_path, partial_path)
+                store = grown
+            store[count] = gray
+            count += 1
+        cap.release()
+        if not count:
+            raise IOError(f"No frames decoded from {path}")
+        if count < len(store):
+            final = resize_frame_store(store, gray_path, count)
+            del store
+            os.remove(partial_path)
+        else:
+            final = store
+            del store
+            final.flush()
+            os.replace(partial_path, gray_path)
+        del final
+        meta['gray_ms'] = 1000 * gray_time / count
+        meta['blur_ms'] = {}
+
+    gray = None
+    for kernel in kernels:
+        blur_path = os.path.join(cache_dir, f"{key}_blur{kernel}.npy")
+        if os.path.exists(blur_path) and str(kernel) in meta.get('blur_ms', {}):
+            continue
+        if gray is None:
+            gray = np.load(gray_path, mmap_mode='r')
+        blurred = np.lib.format.open_memmap(blur_path, mode='w+', dtype=gray.dtype, shape=gray.shape)
+        start = time.perf_counter()
+        for i in range(len(gray)):
+            blurred[i] = gray[i] if kernel <= 1 else cv.GaussianBlur(gray[i], (kernel, kernel), 0)
+        meta.setdefault('blur_ms', {})[str(kernel)] = 1000 * (time.perf_counter() - start) / len(gray)
+        blurred.flush()
+        del blurred
+
+    with open(meta_path, 'w') as f:
+        json.dump(meta, f)
+    meta['blur_paths'] = {kernel: os.path.join(cache_dir, f"{key}_blur{kernel}.npy") for kernel in kernels}
+    return meta
+
+
+def evaluate_group(blur_path, fps, segment, configs):
+    """Run every tracker config sharing one (clip, blur, segmentation) stage.
+
+    Candidates (contours or components) are detected once per frame and handed
+    to each config's tracker.
+    Returns (segment ms/frame, [(total_distance series, track ms/frame)]).
+    """
+    import cv2 as cv
+    from cameraTracker import CameraTracker
+    cv.setNumThreads(1)
+
+    blurred = np.load(blur_path, mmap_mode='r')
+    trackers = []
+    for params in configs:
+        tracker = CameraTracker(camera_id=0)
+        for name, value in params.items():
+            setattr(tracker, name, value)
+        trackers.append(tracker)
+
+    series = np.zeros((len(configs), len(blurred)), dtype=np.float32)
+    track_time = np.zeros(len(configs))
+    segment_time = 0.0
+    detector = trackers[0]
+    for name, value in segment.items():
+        setattr(detector, name, value)
+
+    for i in range(len(blurred)):
+        start = time.perf_counter()
+        detections = detector.detect(np.ascontiguousarray(blurred[i]))
+        segment_time += time.perf_counter() - start
+        t = i / fps
+        for j, tracker in enumerate(trackers):
+            start = time.perf_counter()
+            tracker.update(detections, timestamp=t)
+            track_time[j] += time.perf_counter() - start
+            series[j, i] = tracker.total_distance
+
+    n = max(len(blurred), 1)
+    return 1000 * segment_time / n, [(series[j], 1000 * track_time[j] / n) for j in range(len(configs))]
+
+
+def load_truth(path):
+    """Read <clip>.truth.csv as (t, total_distance) arrays, or None if absent"""
+    truth_path = os.path.splitext(path)[0] + '.truth.csv'
+    if not os.path.exists(truth_path):
+        return None
+    data = np.genfromtxt(truth_path, delimiter=',', names=True)
+    return data['t'], data['total_distance']
+
+
+def series_error(series, fps, truth):
+    """RMS error of a total_distance series against (t, total_distance) truth"""
+    t = np.arange(len(series)) / fps
+    truth_t, truth_d = truth
+    expected = np.interp(t, truth_t, truth_d)
+    return float(np.sqrt(np.mean((series - expected) ** 2)))
+
+
+def run_sweep(paths, grid, cache_dir, workers=None, max_frames=None):
+    """Evaluate every grid config on every clip.
+
+    Returns one dict per config with its params, mean RMS error and mean
+    per-frame cost in ms, unsorted.
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    clips = find_videos(paths)
+    configs = list(expand_grid(grid))
+    baseline = default_params()
+    if baseline not in configs:
+        # Needed as the reference for clips without ground truth
+        configs.append(baseline)
+    kernels = sorted({params['BLUR_KERNEL'] for params in configs})
+    print(f"{len(configs)} configs x {len(clips)} clips")
+
+    errors = np.zeros((len(configs), len(clips)))
+    costs = np.zeros((len(configs), len(clips)))
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # Stage 1: shared grayscale + blur caches, one task per clip
+        metas = list(executor.map(build_clip_cache, clips, itertools.repeat(kernels),
+                                  itertools.repeat(cache_dir), itertools.repeat(max_frames)))
+
+        # Stage 2: one task per (clip, blur, segmentation) group
+        groups = {}
+        for idx, params in enumerate(configs):
+            key = (params['BLUR_KERNEL'],) + tuple(params[name] for name in SEGMENT_PARAMS)
+            groups.setdefault(key, []).append(idx)
+
+        futures = {}
+        for c, meta in enumerate(metas):
+            for (kernel, *segment), indices in groups.items():
+                future = executor.submit(evaluate_group, meta['blur_paths'][kernel], meta['fps'],
+                                         dict(zip(SEGMENT_PARAMS, segment)), [configs[i] for i in indices])
+                futures[future] = (c, kernel, indices)
+
+        results = {}
+        for future, (c, kernel, indices) in futures.items():
+            segment_ms, per_config = future.result()
+            shared_ms = metas[c]['gray_ms'] + metas[c]['blur_ms'][str(kernel)] + segment_ms
+            for idx, (series, track_ms) in zip(indices, per_config):
+                results[(idx, c)] = series
+                costs[idx, c] = shared_ms + track_ms
+
+    baseline_idx = configs.index(baseline)
+    for c, path in enumerate(clips):
+        truth = load_truth(path)
+        if truth is None:
+            reference = results[(baseline_idx, c)]
+            truth = (np.arange(len(reference)) / metas[c]['fps'], reference)
+        for idx in range(len(configs)):
+            errors[idx, c] = series_error(results[(idx, c)], metas[c]['fps'], truth)
+
+    return [{'params': params, 'error': float(errors[i].mean()), 'cost_ms': float(costs[i].mean())}
+            for i, params in enumerate(configs)]
+
+
+def rank_results(results, tolerance):
+    """Configs within tolerance first, cheapest first; the rest by error"""
+    return sorted(results, key=lambda r: (r['error'] > tolerance,
+                                          r['cost_ms'] if r['error'] <= tolerance else r['error']))
+
+
+def parse_value(text):
+    """Numbers and booleans as JSON, anything else as a plain string"""
+    try:
+        return json.loads(text)
+    except ValueError:
+        return text
+
+
+def parse_grid(text):
+    """Parse NAME=v1,v2,... into (name, [values])"""
+    name, _, values = text.partition('=')
+    return name.strip(), [parse_value(value.strip()) for value in values.split(',')]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sweep CameraTracker parameters over recorded clips")
+    parser.add_argument("paths", nargs="+", help="video files or directories")
+    parser.add_argument("--grid", action="append", default=[], type=parse_grid,
+                        help="parameter values, e.g. DISTANCE_THRESHOLD=1,2.5,4")
+    parser.add_argument("--tolerance", type=float, default=2.0, help="max acceptable RMS error in px")
+    parser.add_argument("--cache-dir", default=".sweep_cache", help="where preprocessed frames are kept")
+    parser.add_argument("--max-frames", type=int, default=None, help="only use the first N frames of each clip")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--out", default=None, help="write the ranked table to this CSV")
+    args = parser.parse_args()
+
+    results = run_sweep(args.paths, dict(args.grid), args.cache_dir,
+                        workers=args.workers, max_frames=args.max_frames)
+    ranked = rank_results(results, args.tolerance)
+
+    print(f"{'rank':>4} {'error px':>9} {'cost ms':>8} {'fps':>7}  params")
+    for rank, result in enumerate(ranked, 1):
+        marker = ' ' if result['error'] <= args.tolerance else '*'
+        changed = {k: v for k, v in result['params'].items() if k in dict(args.grid)}
+        fps = 1000 / result['cost_ms'] if result['cost_ms'] > 0 else float('inf')
+        print(f"{rank:>4} {result['error']:>9.2f} {result['cost_ms']:>8.3f} {fps:>7.0f}{marker} {changed}")
+    print("* = outside tolerance")
+
+    if args.out:
+        with open(args.out, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['rank', 'error_px', 'cost_ms', 'fps'] + list(SWEEP_PARAMS))
+            for rank, result in enumerate(ranked, 1):
+                fps = 1000 / result['cost_ms'] if result['cost_ms'] > 0 else ''
+                writer.writerow([rank, f"{result['error']:.4f}", f"{result['cost_ms']:.4f}", fps] +
+                                [result['params'][name] for name in SWEEP_PARAMS])
+        print(f"Results saved to {args.out}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,596 @@
+# Rig registry for CoagulexApp
+# Each rig owns its frame source, tracker, temperature channel and display tile.
+# Capture and tracking run on one worker thread per rig (OpenCV releases the GIL,
+# so rigs spread across cores); the Tk thread only shows the latest processed frame.
+
+import os
+import threading
+import time
+from collections import deque
+
+import cv2 as cv
+
+from cameraTracker import CameraTracker
+from clipRecorder import ClipRecorder
+from clotDetector import ClotDetector
+from multiWellTracker import MultiWellTracker
+from frameSync import FrameSlot, GrabSynchronizer, TimestampSynchronizer
+
+# Rig states, driven by the temperature stream
+IDLE = 'idle'          # no temperature reading yet
+WARMING = 'warming'    # heater below threshold; low-rate preview only
+READY = 'ready'        # at temperature; full-rate capture, waiting for a lock
+TRACKING = 'tracking'  # tracker locked on the sample
+DONE = 'done'          # run finished; back to preview
+FULL_RATE_STATES = (READY, TRACKING)
+
+
+class CaptureConfig:
+    """Capture mode requested from one rig's camera.
+
+    Negotiating a compressed, right-sized mode up front stops USB webcams from
+    falling back to uncompressed YUYV at low frame rates or oversized frames.
+    With MJPG, grayscale output and decode_scale > 1 the worker decodes the raw
+    JPEG itself at reduced size, which is much cheaper than a full colour decode.
+    """
+    def __init__(self, fourcc='MJPG', width=640, height=480, fps=30, buffer_size=1,
+                 lock_exposure=False, exposure=None, grayscale=False, decode_scale=1):
+        self.fourcc = fourcc
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.buffer_size = buffer_size
+        self.lock_exposure = lock_exposure
+        self.exposure = exposure
+        self.grayscale = grayscale          # deliver single-channel frames when colour is not displayed
+        self.decode_scale = decode_scale    # 1, 2, 4 or 8; JPEG is decoded at 1/scale size
+
+
+# imdecode flags for reduced-size JPEG decoding, by (grayscale, scale)
+DECODE_FLAGS = {
+    (True, 1): cv.IMREAD_GRAYSCALE, (True, 2): cv.IMREAD_REDUCED_GRAYSCALE_2,
+    (True, 4): cv.IMREAD_REDUCED_GRAYSCALE_4, (True, 8): cv.IMREAD_REDUCED_GRAYSCALE_8,
+    (False, 1): cv.IMREAD_COLOR, (False, 2): cv.IMREAD_REDUCED_COLOR_2,
+    (False, 4): cv.IMREAD_REDUCED_COLOR_4, (False, 8): cv.IMREAD_REDUCED_COLOR_8,
+}
+
+
+class FrameSource:
+    """Capture device for one rig.
+
+    A capture thread keeps draining the device, stamps each frame with the time
+    it was grabbed and decodes it into a single latest-frame slot. Consumers
+    always get the freshest frame with its true capture time instead of whatever
+    has queued up in the driver while they were busy; frames that were
+    overwritten before anyone took them are counted in `skipped`.
+    """
+    def __init__(self, path, config=None):
+        self.path = path
+        self.config = config or CaptureConfig()
+        self.cap = None
+        self.raw_jpeg = False
+
+        self.cond = threading.Condition()
+        self.thread = None
+        self.running = False
+        self.frame = None
+        self.timestamp = None
+        self.seq = 0
+        self.consumed_seq = 0
+        self.grabbed = 0
+        self.skipped = 0
+        self.errors = 0  # frames whose decode or listeners raised
+        self.listeners = []  # called as listener(source, frame, timestamp) on the capture thread
+        self.min_interval = 0.0  # seconds between decoded frames; grabs in between are dropped undecoded
+        self.last_publish = None
+
+    def open(self):
+        from cameraDiscovery import open_device
+        self.cap = open_device(self.path)
+        if not self.cap.isOpened():
+            return False
+        self.apply_config()
+        return True
+
+    def apply_config(self):
+        """Request the configured mode; FOURCC must be set before size and rate"""
+        c = self.config
+        if c.fourcc:
+            self.cap.set(cv.CAP_PROP_FOURCC, cv.VideoWriter_fourcc(*c.fourcc))
+        if c.width and c.height:
+            self.cap.set(cv.CAP_PROP_FRAME_WIDTH, c.width)
+            self.cap.set(cv.CAP_PROP_FRAME_HEIGHT, c.height)
+        if c.fps:
+            self.cap.set(cv.CAP_PROP_FPS, c.fps)
+        if c.buffer_size:
+            self.cap.set(cv.CAP_PROP_BUFFERSIZE, c.buffer_size)
+        if c.lock_exposure:
+            # V4L2 uses 1 for manual exposure, DirectShow/MSMF use 0.25
+            manual = 1 if self.cap.getBackendName() == 'V4L2' else 0.25
+            self.cap.set(cv.CAP_PROP_AUTO_EXPOSURE, manual)
+            if c.exposure is not None:
+                self.cap.set(cv.CAP_PROP_EXPOSURE, c.exposure)
+
+        # Ask for the undecoded JPEG so we can decode it gray and/or reduced ourselves
+        if c.fourcc == 'MJPG' and (c.grayscale or c.decode_scale > 1):
+            self.raw_jpeg = bool(self.cap.set(cv.CAP_PROP_CONVERT_RGB, 0))
+
+        fourcc = int(self.cap.get(cv.CAP_PROP_FOURCC))
+        actual = (fourcc.to_bytes(4, 'little').decode(errors='replace'),
+                  int(self.cap.get(cv.CAP_PROP_FRAME_WIDTH)), int(self.cap.get(cv.CAP_PROP_FRAME_HEIGHT)),
+                  self.cap.get(cv.CAP_PROP_FPS))
+        print(f"Camera {self.path}: negotiated {actual[0]} {actual[1]}x{actual[2]} @ {actual[3]:g} fps")
+        # A camera that refused MJPG would hand back raw YUYV buffers, so let the backend convert those
+        if self.raw_jpeg and actual[0] != 'MJPG':
+            self.cap.set(cv.CAP_PROP_CONVERT_RGB, 1)
+            self.raw_jpeg = False
+            print(f"Camera {self.path}: not MJPG, decoding through the backend")
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self.capture_loop, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+        with self.cond:
+            self.cond.notify_all()
+
+    def capture_loop(self):
+        while self.running:
+            if not self.cap.grab():
+                time.sleep(0.005)
+                continue
+            timestamp = time.time()
+            if not self.due(timestamp):
+                continue
+            # One bad frame must not end the thread and freeze the rig
+            try:
+                ret, frame = self.retrieve()
+                if ret:
+                    self.publish(frame, timestamp)
+            except Exception as e:
+                self.errors += 1
+                if self.errors == 1 or self.errors % 100 == 0:
+                    print(f"Camera {self.path}: frame failed ({self.errors} so far): {e}")
+        self.release()
+
+    def due(self, timestamp):
+        """True if a frame grabbed at timestamp should be decoded at the current rate"""
+        return self.last_publish is None or timestamp - self.last_publish >= self.min_interval
+
+    def publish(self, frame, timestamp):
+        """Make frame the latest one; used by the capture thread or a synchroniser"""
+        # Consumers share this array (tracker, display, recorder), so nobody may write to it
+        frame.setflags(write=False)
+        with self.cond:
+            self.last_publish = timestamp
+            self.grabbed += 1
+            if self.seq != self.consumed_seq:
+                self.skipped += 1
+            self.frame = frame
+            self.timestamp = timestamp
+            self.seq += 1
+            self.cond.notify_all()
+        for listener in self.listeners:
+            listener(self, frame, timestamp)
+
+    def next_frame(self, timeout=1.0):
+        """Wait for a frame newer than the last one returned.
+
+        Returns (frame, capture timestamp), or (None, None) on timeout or stop.
+        The returned array is never written to by the capture thread again.
+        """
+        with self.cond:
+            self.cond.wait_for(lambda: self.seq != self.consumed_seq or not self.running, timeout)
+            if self.seq == self.consumed_seq:
+                return None, None
+            self.consumed_seq = self.seq
+            return self.frame, self.timestamp
+
+    def retrieve(self):
+        """Decode the last grabbed frame into the configured colour mode and scale"""
+        ret, frame = self.cap.retrieve()
+        if not ret:
+            return ret, frame
+        c = self.config
+        if self.raw_jpeg and (frame.ndim == 1 or frame.shape[0] == 1):
+            frame = cv.imdecode(frame.reshape(-1), DECODE_FLAGS[(c.grayscale, c.decode_scale)])
+            return frame is not None, frame
+        # Backend decoded for us; convert and scale the slow way
+        if c.grayscale and frame.ndim == 3 and frame.shape[2] == 3:
+            frame = cv.cvtColor(frame, cv.COLOR_BGR2GRAY)
+        if c.decode_scale > 1:
+            frame = cv.resize(frame, (frame.shape[1] // c.decode_scale, frame.shape[0] // c.decode_scale),
+                              interpolation=cv.INTER_AREA)
+        return True, frame
+
+    def release(self):
+        if self.cap is not None:
+            self.cap.release()
+
+
+class Rig:
+    """One camera position: camera, tracker, temperature channel and display tile.
+
+    With wells (a list of (x, y, w, h) regions) the camera tracks one sample per well.
+    An ungated rig (gated=False) ignores temperature and is ready as soon as its
+    camera runs, for rigs without a sensor channel on the board.
+    """
+    def __init__(self, rig_id, temp_channel=None, buffer_size=100, display_size=(640, 360), capture_config=None,
+                 wells=None, gated=True):
+        self.rig_id = rig_id
+        self.temp_channel = rig_id if temp_channel is None else temp_channel  # Tn field on the board
+        self.gated = gated
+        self.tracker = MultiWellTracker(rig_id, wells) if wells else CameraTracker(camera_id=rig_id)
+        self.temps = deque(maxlen=buffer_size)
+        self.tracking_active = True
+
+        # Temperature gating: preview at PREVIEW_FPS until the rig reaches threshold
+        self.state = IDLE
+        self.threshold = 37.0
+        self.HYSTERESIS = 0.5  # degrees below threshold before a ready rig drops back to warming
+        self.PREVIEW_FPS = 2.0
+
+        # Clot endpoint per tracked sample, detected from its centre while tracking
+        self.temperature = None  # latest valid reading for this rig's channel
+        self.clot_detectors = [ClotDetector(rig_id) for _ in self.tracker.targets()]
+        self.clot_events = [None] * len(self.clot_detectors)
+
+        # Last seconds of compressed footage, saved around clots, tracking losses and
+        # operator requests once the GUI gives it a directory
+        self.recorder = ClipRecorder(f"rig{rig_id}")
+        self.samples_matched = True
+
+        self.display_size = display_size
+        self.capture_config = capture_config or CaptureConfig()
+
+        # Guards the tracker between the worker thread and resets from the Tk thread
+        self.lock = threading.Lock()
+        # Guards state transitions, which the serial, worker and Tk threads all make; kept apart
+        # from self.lock so a temperature reading never waits for a frame to be tracked
+        self.state_lock = threading.Lock()
+
+        self.source = None
+        self.thread = None
+        self.running = False
+
+        # Latest processed RGB frame, written by the worker and read by the Tk thread
+        self.display_frame = None
+        self.display_seq = 0
+        self.shown_seq = 0
+        self.fps = 0.0
+        self.last_frame_time = None
+
+        # With a synchroniser the worker takes frames from aligned sets through this
+        # slot instead of from the source; set_seq and set_skew describe the set of
+        # the frame being processed
+        self.slot = None
+        self.set_seq = None
+        self.set_skew = 0.0
+
+        # Settings snapshot from the config store; the worker applies its tracker
+        # values between frames
+        self.config = None
+        self.tracker_config_version = 0
+        self.tracker_applied = {}     # tracker values last applied, so a new version only passes what changed
+        self.tracker_fallback = None  # settings before the last change, until a frame tracks with the new ones
+
+        # Pipeline stage shown instead of the camera frame, or None
+        self.debug_view = None
+        self.tap_frame = None
+
+        # Display tile widgets, created by the GUI
+        self.video_label = None
+        self.temp_label = None
+        self.distance_label = None
+        self.camera_label = None
+        self.line = None
+
+    def stop(self):
+        self.running = False
+        if self.source is not None:
+            self.source.stop()
+        if self.slot is not None:
+            self.slot.close()
+        self.recorder.stop()
+
+    def set_state(self, state):
+        """Switch state and the capture rate that goes with it; callers hold self.state_lock"""
+        if state == self.state:
+            return
+        print(f"Rig {self.rig_id}: {self.state} -> {state}")
+        self.state = state
+        self.apply_rate()
+
+    def apply_rate(self):
+        if self.source is not None:
+            self.source.min_interval = 0.0 if self.state in FULL_RATE_STATES else 1.0 / self.PREVIEW_FPS
+
+    def configure(self, config):
+        """Adopt a RigConfig: gate values now, tracker values before the worker's next frame"""
+        for name, value in config.rig.items():
+            setattr(self, name, value)
+        self.apply_rate()
+        self.config = config
+        if not self.running:
+            self.apply_tracker_config()
+
+    def apply_tracker_config(self):
+        config = self.config
+        if config is None or config.version == self.tracker_config_version:
+            return
+        self.tracker_config_version = config.version
+        # A rig-only edit also makes a new version; passing unchanged tracker values would undo the
+        # tracker's own fallbacks and reset its gates
+        changes = {name: value for name, value in config.tracker.items()
+                   if name not in self.tracker_applied or self.tracker_applied[name] != value}
+        if not changes:
+            return
+        self.tracker_applied = dict(config.tracker)  # a rejected value is not retried on later edits
+        with self.lock:
+            previous = {name: getattr(self.tracker, name) for name in changes}
+            try:
+                self.tracker.configure(changes)
+            except ValueError as e:
+                print(f"Rig {self.rig_id}: keeping the previous tracker settings, version {config.version} "
+                      f"was rejected: {e}")
+                self.tracker.configure(previous)
+                return
+            self.tracker_fallback = previous
+
+    def update_temperature(self, temp):
+        """Advance the state machine with a new reading for this rig's channel"""
+        if temp != temp or not self.gated:  # NaN: channel missing from this line
+            return
+        self.temperature = temp
+        with self.state_lock:
+            if self.state == IDLE:
+                self.set_state(WARMING)
+            if self.state == WARMING and temp >= self.threshold:
+                self.set_state(READY)
+            elif self.state == READY and temp < self.threshold - self.HYSTERESIS:
+                # Only before a lock; a run in progress is not abandoned on a dip
+                self.set_state(WARMING)
+
+    def finish(self):
+        """Mark the run finished; tracking stops and capture drops to preview rate"""
+        with self.state_lock:
+            if self.state == TRACKING:
+                self.set_state(DONE)
+
+    def start_processing(self):
+        """Start the tracking worker on an already open source"""
+        self.running = True
+        if not self.gated:
+            with self.state_lock:
+                self.set_state(READY)
+        self.thread = threading.Thread(target=self.process_loop, daemon=True)
+        self.thread.start()
+
+    def open_source(self, on_status=None):
+        on_status = on_status or (lambda text, bootstyle: None)
+        on_status("opening...", "warning")
+        if not self.source.open():
+            print(f"Warning: Could not open camera {self.source.path} for rig {self.rig_id}.")
+            on_status("not found", "danger")
+            return False
+        self.apply_rate()
+        self.load_calibration()
+        self.source.listeners.append(self.recorder.add_frame)
+        self.recorder.start()
+        on_status(os.path.basename(self.source.path), "success")
+        return True
+
+    def load_calibration(self):
+        """Use the stored calibration of the camera now attached to this rig, if any"""
+        from cameraCalibration import load_calibration
+        from cameraDiscovery import device_identity
+        identity = device_identity(self.source.path)
+        calibration = load_calibration(identity)
+        with self.lock:
+            self.tracker.calibration = calibration
+        if calibration is not None:
+            print(f"Rig {self.rig_id}: using calibration for {identity} ({calibration.mm_per_px:.4f} mm/px)")
+
+    def set_debug_view(self, name):
+        """Show a tracker pipeline stage (see debugTaps.TAP_NAMES) instead of the frame; None for off"""
+        if self.debug_view is not None:
+            self.tracker.taps.unsubscribe(self.debug_view, self.on_tap)
+        self.tap_frame = None
+        self.debug_view = name
+        if name is not None:
+            self.tracker.taps.subscribe(name, self.on_tap)
+
+    def on_tap(self, name, image):
+        # Runs on this rig's worker; the image is only resized for display, never written
+        self.tap_frame = image
+
+    def next_frame(self):
+        """Next frame to process and its time: the set's time when synchronised"""
+        if self.slot is None:
+            return self.source.next_frame()
+        frame, timestamp, self.set_seq, self.set_skew = self.slot.get()
+        return frame, timestamp
+
+    def frames_skipped(self):
+        return self.slot.skipped if self.slot is not None else self.source.skipped
+
+    def process_loop(self):
+        frames = 0
+        fps_start = time.perf_counter()
+        while self.running:
+            frame, timestamp = self.next_frame()
+            if frame is None:
+                continue
+            self.apply_tracker_config()
+            self.last_frame_time = timestamp
+
+            # The capture frame is read-only; only the small display buffer is drawn on
+            tracking = self.tracking_active and self.state in FULL_RATE_STATES
+            with self.lock:
+                if tracking:
+                    try:
+                        self.tracker.track(frame, timestamp=timestamp)
+                    except Exception as e:
+                        if self.tracker_fallback is None:
+                            raise
+                        # New settings that break the pipeline are undone instead of stopping the worker
+                        print(f"Rig {self.rig_id}: tracking failed with settings version "
+                              f"{self.tracker_config_version} ({e}); restoring the previous settings")
+                        self.tracker.configure(self.tracker_fallback)
+                    self.tracker_fallback = None
+                    with self.state_lock:
+                        if self.state == READY and self.tracker.tracking_locked:
+                            self.set_state(TRACKING)
+                    if self.state == TRACKING:
+                        self.check_lock(timestamp)
+                        self.check_clot(timestamp)
+            source = frame
+            if self.debug_view is not None and tracking and self.tap_frame is not None:
+                source = self.tap_frame
+            display = cv.resize(source, self.display_size)
+            if tracking:
+                if display.ndim == 2:
+                    display = cv.cvtColor(display, cv.COLOR_GRAY2BGR)
+                scale = (display.shape[1] / source.shape[1], display.shape[0] / source.shape[0])
+                with self.lock:
+                    self.tracker.draw(display, scale)
+            # Grayscale frames go to PIL as-is
+            self.display_frame = display if display.ndim == 2 else cv.cvtColor(display, cv.COLOR_BGR2RGB)
+            self.display_seq += 1
+
+            frames += 1
+            now = time.perf_counter()
+            if now - fps_start >= 1.0:
+                self.fps = frames / (now - fps_start)
+                frames = 0
+                fps_start = now
+        self.source.stop()
+
+    def check_lock(self, timestamp):
+        """Save a clip when a tracked sample stops matching, and when it is found again"""
+        matched = all(target.current_center is not None for target in self.tracker.targets())
+        if matched != self.samples_matched:
+            self.recorder.trigger('relock' if matched else 'loss', timestamp)
+            self.samples_matched = matched
+
+    def check_clot(self, timestamp):
+        """Feed each sample's centre to its clot detector; finish the run once all have fired"""
+        for i, (target, detector) in enumerate(zip(self.tracker.targets(), self.clot_detectors)):
+            event = detector.add(timestamp, target.current_center, self.temperature)
+            if event is not None:
+                print(f"Rig {self.rig_id} sample {i + 1}: clot detected after {event.elapsed:.1f} s "
+                      f"at {event.temperature} °C")
+                self.clot_events[i] = event
+                self.recorder.trigger('clot', timestamp)
+        if all(self.clot_events):
+            self.finish()
+
+    def reset(self):
+        """Reset tracking and temperature history for this rig"""
+        with self.lock:
+            self.tracker.reset_tracking()
+            for detector in self.clot_detectors:
+                detector.reset()
+            self.clot_events = [None] * len(self.clot_detectors)
+            self.samples_matched = True
+        self.temps.clear()
+        self.temperature = None
+        with self.state_lock:
+            self.set_state(READY if not self.gated and self.running else IDLE)
+
+
+class RigRegistry:
+    """Creates the rigs and maps discovered cameras onto them"""
+    def __init__(self, count, buffer_size=100, capture_configs=None, wells=None, temp_channels=None):
+        """temp_channels maps rig id to its board channel (default: the rig id), or to None for an ungated rig"""
+        cols = tile_columns(count)
+        width = 640 // cols
+        capture_configs = capture_configs or {}
+        wells = wells or {}
+        temp_channels = temp_channels or {}
+        self.rigs = {n: Rig(n, temp_channel=temp_channels.get(n), buffer_size=buffer_size,
+                            display_size=(width, width * 9 // 16), capture_config=capture_configs.get(n),
+                            wells=wells.get(n), gated=temp_channels.get(n, n) is not None)
+                     for n in range(1, count + 1)}
+        self.synchronizer = None
+
+    def __iter__(self):
+        return iter(self.rigs.values())
+
+    def __len__(self):
+        return len(self.rigs)
+
+    def __getitem__(self, rig_id):
+        return self.rigs[rig_id]
+
+    def start(self, devices, on_status=None, sync=None, tolerance=0.02):
+        """Open and start every rig that has a device in {rig_id: path}.
+
+        sync is None, 'timestamp' (match independently captured frames by capture
+        time) or 'grab' (capture all cameras in lockstep on one thread).
+        OpenCV's own thread pool is shrunk so N rig threads do not oversubscribe the cores.
+        """
+        cv.setNumThreads(max(1, (os.cpu_count() or 1) // max(len(self.rigs), 1)))
+
+        # Open all assigned devices in parallel
+        opened = {}
+        threads = []
+        for rig in self:
+            path = devices.get(rig.rig_id)
+            status = (lambda text, bootstyle, n=rig.rig_id: on_status(n, text, bootstyle)) if on_status else None
+            if path is None:
+                print(f"Warning: No camera assigned to rig {rig.rig_id}.")
+                if status:
+                    status("not found", "danger")
+                continue
+            rig.source = FrameSource(path, rig.capture_config)
+
+            def open_rig(rig=rig, status=status):
+                if rig.open_source(status):
+                    opened[rig.rig_id] = rig
+            threads.append(threading.Thread(target=open_rig, daemon=True))
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        sources = {rig_id: opened[rig_id].source for rig_id in sorted(opened)}
+        if sync in ('grab', 'timestamp') and len(sources) > 1:
+            # Workers process the frames of each aligned set, not each camera's latest
+            for rig in opened.values():
+                rig.slot = FrameSlot()
+            if sync == 'grab':
+                self.synchronizer = GrabSynchronizer(sources)
+            else:
+                self.synchronizer = TimestampSynchronizer(sources, tolerance)
+            self.synchronizer.listeners.append(self.on_frame_set)
+        if isinstance(self.synchronizer, GrabSynchronizer):
+            self.synchronizer.start()
+        else:
+            for source in sources.values():
+                source.start()
+        for rig in opened.values():
+            rig.start_processing()
+
+    def on_frame_set(self, frame_set):
+        """Synchroniser listener: hand each member rig its frame, stamped with the set's time"""
+        for rig_id, frame in frame_set.frames.items():
+            self.rigs[rig_id].slot.put(frame, frame_set.timestamp, frame_set.seq, frame_set.skew)
+
+    def stop(self):
+        if self.synchronizer is not None:
+            self.synchronizer.stop()
+        for rig in self:
+            rig.stop()
+
+
+def tile_columns(count):
+    """Columns for the video grid: a single column for up to two rigs, else near-square"""
+    if count <= 2:
+        return 1
+    cols = 1
+    while cols * cols < count:
+        cols += 1
+    return cols
@@ -0,0 +1,169 @@
+# CPCA board simulator
+# Replays captured CPCA_PassThru_RevE.ino output, or synthesises PID-like heating
+# curves in the same line format, and serves them over a Linux pseudo-terminal so
+# the GUI ingest path can be stress-tested without a board attached.
+#
+# Usage:
+#   python serialSimulator.py                       # synthetic curves at the board's rate
+#   python serialSimulator.py --rate 5000           # synthetic curves, 5000 lines/s
+#   python serialSimulator.py --replay capture.log  # replay a captured serial log
+# The slave device path (e.g. /dev/pts/4) is printed on startup; point
+# COAGULEX_SERIAL_PORT at it before launching coagulexCode.py.
+
+import argparse
+import os
+import random
+import time
+
+# Values mirrored from CPCA_PassThru_RevE.ino
+RNOMINAL = 100.0
+RSETPOINT = 114.56  # pt100 resistance at 37.5 deg C in ohms
+PFACTOR = 80
+DFACTOR = 15
+BOARD_LINE_INTERVAL = 0.9  # Two 200 ms heater cycles plus the 500 ms delay per loop
+
+# Callendar-Van Dusen coefficients for a PT100 above 0 deg C
+CVD_A = 3.9083e-3
+CVD_B = -5.775e-7
+
+
+def pt100_resistance(temp):
+    """Resistance of a PT100 at the given temperature"""
+    return RNOMINAL * (1 + CVD_A * temp + CVD_B * temp * temp)
+
+
+def format_board_line(r1, r2, t1, t2, out1, out2):
+    """Format one loop() iteration exactly as the board prints it"""
+    return (f"Rig 1 Resistance = {r1:.8f}\tRig 2 Resistance = {r2:.8f}\t\t"
+            f"T1:{t1:.2f} T2:{t2:.2f}\t{out1:.4f} {out2:.4f}")
+
+
+class HeaterModel:
+    """First-order thermal model of one rig driven by the board's PD controller"""
+    def __init__(self, ambient=22.0, setpoint_r=RSETPOINT, gain=0.012, loss=0.004, noise=0.03):
+        self.temp = ambient
+        self.ambient = ambient
+        self.setpoint_r = setpoint_r
+        self.gain = gain
+        self.loss = loss
+        self.noise = noise
+        self.prev_error = None
+        self.output = 0.0
+
+    def step(self, dt):
+        """Advance the model by dt seconds and return (resistance, temp, output)"""
+        resistance = pt100_resistance(self.temp)
+        error = self.setpoint_r - resistance
+        derivative = 0.0 if self.prev_error is None else (error - self.prev_error) / dt
+        self.prev_error = error
+        # PID_v1 clamps the output to 0-255, but the loop only has 100 ms of drive time
+        self.output = min(max(PFACTOR * error + DFACTOR * derivative, 0.0), 100.0)
+
+        heating = self.gain * self.output
+        cooling = self.loss * (self.temp - self.ambient)
+        self.temp += (heating - cooling) * dt + random.gauss(0, self.noise)
+        return resistance, self.temp, self.output
+
+
+def synthesize_lines(ambient=22.0, dt=BOARD_LINE_INTERVAL, offsets=(0.0, 0.4)):
+    """Endless generator of board lines for a two-rig warm-up and hold"""
+    rigs = [HeaterModel(ambient=ambient + offset) for offset in offsets]
+    while True:
+        (r1, t1, o1), (r2, t2, o2) = (rig.step(dt) for rig in rigs)
+        yield format_board_line(r1, r2, t1, t2, o1, o2)
+
+
+def replay_lines(path, loop=True):
+    """Generator over the non-empty lines of a captured serial log"""
+    while True:
+        with open(path, "r", errors="ignore") as f:
+            lines = [line.rstrip("\r\n") for line in f if line.strip()]
+        if not lines:
+            raise ValueError(f"No lines to replay in {path}")
+        yield from lines
+        if not loop:
+            return
+
+
+def open_pty():
+    """Open a raw pseudo-terminal pair and return (master_fd, slave_path)"""
+    import tty
+    master_fd, slave_fd = os.openpty()
+    tty.setraw(slave_fd)
+    return master_fd, os.ttyname(slave_fd)
+
+
+def serve(lines, write, rate=1 / BOARD_LINE_INTERVAL, report_interval=5.0, max_lines=None, max_batch=512):
+    """Pace lines into write() at `rate` lines per second (0 = as fast as possible).
+
+    Lines that fall due together are written in one call so thousands of lines per
+    second do not cost one syscall each. Returns the number of lines sent.
+    """
+    start = time.perf_counter()
+    last_report = start
+    sent = 0
+    batch = []
+
+    for line in lines:
+        batch.append(line)
+        done = max_lines is not None and sent + len(batch) >= max_lines
+        if not done and len(batch) < max_batch:
+            # Keep batching while we are behind schedule (or unthrottled)
+            if rate <= 0 or sent + len(batch) < int((time.perf_counter() - start) * rate) + 1:
+                continue
+
+        write(("\r\n".join(batch) + "\r\n").encode())
+        sent += len(batch)
+        batch = []
+        if done:
+            break
+
+        now = time.perf_counter()
+        if now - last_report >= report_interval:
+            print(f"Sent {sent} lines ({sent / (now - start):.0f} lines/s)")
+            last_report = now
+
+        if rate > 0:
+            # Sleep until the next line is due
+            next_due = start + sent / rate
+            if next_due > now:
+                time.sleep(next_due - now)
+
+    if batch:
+        write(("\r\n".join(batch) + "\r\n").encode())
+        sent += len(batch)
+    return sent
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve simulated CPCA serial output over a pty")
+    parser.add_argument("--replay", help="captured serial log to replay instead of synthetic curves")
+    parser.add_argument("--rate", type=float, default=1 / BOARD_LINE_INTERVAL,
+                        help="lines per second, 0 for unthrottled (default: board rate)")
+    parser.add_argument("--count", type=int, default=None, help="stop after this many lines")
+    parser.add_argument("--no-loop", action="store_true", help="stop at the end of the replay file")
+    parser.add_argument("--ambient", type=float, default=22.0, help="starting temperature for synthetic curves")
+    args = parser.parse_args()
+
+    if args.replay:
+        lines = replay_lines(args.replay, loop=not args.no_loop)
+    else:
+        lines = synthesize_lines(ambient=args.ambient)
+
+    master_fd, slave_path = open_pty()
+    print(f"Serving CPCA data on {slave_path} at "
+          f"{'unthrottled' if args.rate <= 0 else f'{args.rate:g} lines/s'}")
+
+    # Startup banner, as printed by setup()
+    os.write(master_fd, b"CPCA REV E\r\n")
+    try:
+        sent = serve(lines, lambda data: os.write(master_fd, data), rate=args.rate, max_lines=args.count)
+        print(f"Done, sent {sent} lines")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        os.close(master_fd)
+
+
+if __name__ == '__main__':
+    main()
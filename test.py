@@ -1,20 +1,25 @@
-import serial
 import threading
-import matplotlib.pyplot as plt
-from matplotlib.figure import Figure
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-import matplotlib.dates as mdates
 from datetime import datetime, timedelta
-import numpy as np
-import cv2 as cv
 import tkinter as tk
 from tkinter import *
-from PIL import Image, ImageTk
 import time
 from collections import deque
-import ttkbootstrap as ttk
-from ttkbootstrap import Style
-from ttkbootstrap.constants import *
+
+# Heavy modules are bound by load_heavy_modules() on a background thread, so the
+# window appears before matplotlib, OpenCV, PIL and pyserial load.
+serial = np = cv = None
+Figure = FigureCanvasTkAgg = mdates = Image = ImageTk = None
+
+def load_heavy_modules():
+    """Import the plotting, vision and serial modules into this module's globals"""
+    global serial, np, cv, Figure, FigureCanvasTkAgg, mdates, Image, ImageTk
+    import numpy as np
+    import cv2 as cv
+    from PIL import Image, ImageTk
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+    import matplotlib.dates as mdates
+    import serial
 
 # Buffers
 BUFFER_SIZE = 100
@@ -37,39 +42,52 @@ window.configure(background="#EEF7FF")
 window.grid_columnconfigure(0, weight=1)
 window.grid_columnconfigure(1, weight=1)
 
-# Icon
-try:
-    img = Image.open("C:/Python/Pfp.jpg")
-    icon = ImageTk.PhotoImage(img)
-    window.iconphoto(True, icon)
-except:
-    print("Icon not loaded.")
-
-# Plot setup
-fig = Figure(figsize=(6.4, 4.8), dpi=100)
-ax = fig.add_subplot(111)
-line1, = ax.plot([], [], '-', label="Temp 1 (°C)", color='tab:blue')
-line2, = ax.plot([], [], '-', label="Temp 2 (°C)", color='tab:orange')
-ax.set_title("Real-Time Temperature")
-ax.set_xlabel("Time")
-ax.set_ylabel("Temperature (°C)")
-ax.grid(True)
-ax.legend()
-
-canvas = FigureCanvasTkAgg(fig, master=window)
-canvas_widget = canvas.get_tk_widget()
-canvas_widget.grid(row=0, column=0, padx=10, pady=10, sticky="nw")
+loading_label = Label(window, text="Loading modules...", font=("Times New Roman", 14), bg="#EEF7FF")
+loading_label.grid(row=0, column=0, padx=10, pady=10, sticky="nw")
+
+fig = ax = line1 = line2 = canvas = icon = None
+
+def setup_plot():
+    """Icon and temperature plot; needs PIL and matplotlib loaded"""
+    global fig, ax, line1, line2, canvas, icon
+    # Icon
+    try:
+        img = Image.open("C:/Python/Pfp.jpg")
+        icon = ImageTk.PhotoImage(img)
+        window.iconphoto(True, icon)
+    except:
+        print("Icon not loaded.")
+
+    # Plot setup
+    fig = Figure(figsize=(6.4, 4.8), dpi=100)
+    ax = fig.add_subplot(111)
+    line1, = ax.plot([], [], '-', label="Temp 1 (°C)", color='tab:blue')
+    line2, = ax.plot([], [], '-', label="Temp 2 (°C)", color='tab:orange')
+    ax.set_title("Real-Time Temperature")
+    ax.set_xlabel("Time")
+    ax.set_ylabel("Temperature (°C)")
+    ax.grid(True)
+    ax.legend()
+
+    canvas = FigureCanvasTkAgg(fig, master=window)
+    canvas_widget = canvas.get_tk_widget()
+    canvas_widget.grid(row=0, column=0, padx=10, pady=10, sticky="nw")
 
 # Video display label
 video_label = Label(window)
 video_label.grid(row=0, column=1, padx=10, pady=10)
 
-# Cameras
-vidCap1 = cv.VideoCapture(0)
-vidCap2 = cv.VideoCapture(1)
-if not vidCap1.isOpened() or not vidCap2.isOpened():
-    print("One or both cameras could not be opened.")
-    exit()
+# Cameras, opened in the background so the window shows immediately
+vidCap1 = vidCap2 = None
+
+def open_cameras():
+    global vidCap1, vidCap2
+    cap1 = cv.VideoCapture(0)
+    cap2 = cv.VideoCapture(1)
+    if not cap1.isOpened() or not cap2.isOpened():
+        print("One or both cameras could not be opened.")
+        return
+    vidCap1, vidCap2 = cap1, cap2
 
 # Serial parsing
 def parse_serial_line(line):
@@ -216,6 +234,10 @@ def update_video():
     global tracked_contour1, last_drawn_contour1, last_drawn_center1, last_contour_update_time1, prev_center1, total_distance1, tracking_locked1
     global tracked_contour2, last_drawn_contour2, last_drawn_center2, last_contour_update_time2, prev_center2, total_distance2, tracking_locked2
 
+    if vidCap1 is None or vidCap2 is None:
+        window.after(100, update_video)
+        return
+
     frame1, tracked_contour1, last_drawn_contour1, last_drawn_center1, last_contour_update_time1, prev_center1, total_distance1, tracking_locked1 = \
         process_frame(vidCap1, tracked_contour1, last_drawn_contour1, last_drawn_center1,
                       last_contour_update_time1, prev_center1, total_distance1, tracking_locked1, label_prefix="Cam1 ")
@@ -245,8 +267,25 @@ current_temp_label.grid(row=3, column=0, columnspan=2, pady=5)
 distance_label = Label(window, text="Cam1 Distance: 0.00 px | Cam2 Distance: 0.00 px", font=("Times New Roman", 14), bg="#EEF7FF")
 distance_label.grid(row=4, column=0, columnspan=2, pady=5)
 
+def finish_startup():
+    """Tk thread: build the plot and start the workers once modules are loaded"""
+    loading_label.destroy()
+    setup_plot()
+    threading.Thread(target=serial_reader, daemon=True).start()
+    threading.Thread(target=open_cameras, daemon=True).start()
+    update_video()
+    update_plot()
+
+def load_modules():
+    """Background thread: import heavy modules, then hand over to the Tk thread"""
+    try:
+        load_heavy_modules()
+    except Exception as e:
+        msg = f"Startup failed: {e}"
+        window.after(0, lambda: loading_label.config(text=msg))
+        return
+    window.after(0, finish_startup)
+
 # Run
-threading.Thread(target=serial_reader, daemon=True).start()
-update_video()
-update_plot()
+threading.Thread(target=load_modules, daemon=True).start()
 window.mainloop()
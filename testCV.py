@@ -82,5 +82,12 @@ while True:
 vidCap.release()
 cv.destroyAllWindows()
 
-conv_factor = 0.264  # Example: pixel to cm
-print(f"Total distance moved: {total_distance * conv_factor:.2f} cm")
\ No newline at end of file
+# Pixel-to-mm scale from this camera's checkerboard calibration (cameraCalibration.py)
+# Calibrations are stored by camera identity, the same one the rigs look up
+from cameraCalibration import load_calibration
+from cameraDiscovery import device_identity, index_path
+calibration = load_calibration(device_identity(index_path(0)))
+if calibration is not None:
+    print(f"Total distance moved: {total_distance * calibration.mm_per_px:.2f} mm")
+else:
+    print(f"Total distance moved: {total_distance:.2f} px (camera not calibrated)")
\ No newline at end of file
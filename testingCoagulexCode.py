@@ -18,6 +18,7 @@ from collections import deque
 import ttkbootstrap as ttk
 from ttkbootstrap import Style
 from ttkbootstrap.constants import *
+from grayLut import apply_gray_lut
 
 class CameraTracker:
     """Separate tracking state class for each camera"""
@@ -126,14 +127,11 @@ class CameraTracker:
 
 def quantize_grayscale(image, levels=4):
     """Reduce grayscale image to a limited number of levels."""
-    step = 256 // levels
-    quantized = (image // step) * step
-    return quantized.astype(np.uint8)
+    return apply_gray_lut(image, levels=levels)
 
 def binarize_grayscale(image, threshold=60):
     """Convert grayscale image to pure black and white (0 or 255)."""
-    _, binary = cv.threshold(image, threshold, 255, cv.THRESH_BINARY)
-    return binary
+    return apply_gray_lut(image, threshold=threshold, invert=False)
 
 
 class CoagulexApp:
@@ -0,0 +1,75 @@
+# Per-frame trajectory of a tracked sample
+# Each processed frame appends one fixed-size record to a preallocated numpy
+# array. When the array fills up, its rows are appended to a binary spill file in
+# the session directory (or, with no session, the oldest half is dropped), so
+# memory stays bounded however long a run lasts.
+
+import os
+from datetime import datetime
+
+import numpy as np
+
+TRAJECTORY_DTYPE = np.dtype([
+    ('t', 'f8'),           # capture time, seconds since the epoch
+    ('x', 'f4'),           # centre, pixels; NaN when nothing was matched
+    ('y', 'f4'),
+    ('area', 'f4'),        # contour area, pixels^2
+    ('confidence', 'f4'),  # 0 (no match) to 1 (exact match)
+])
+
+SESSION_ROOT = "sessions"
+
+
+def new_session_dir(root=SESSION_ROOT):
+    """Path for this run's session store; created on first write"""
+    return os.path.join(root, datetime.now().strftime('%Y%m%d_%H%M%S'))
+
+
+class Trajectory:
+    """Bounded, array-backed per-frame record of one tracker's sample"""
+    def __init__(self, capacity=8192, spill_path=None):
+        self.capacity = capacity
+        self.spill_path = spill_path  # binary file of TRAJECTORY_DTYPE rows, or None to keep only recent rows
+        self.rows = np.empty(capacity, dtype=TRAJECTORY_DTYPE)
+        self.count = 0
+        self.spilled = 0
+        self.dropped = 0
+
+    def __len__(self):
+        return self.spilled + self.count
+
+    def append(self, t, x, y, area, confidence):
+        if self.count == self.capacity:
+            self.spill()
+        self.rows[self.count] = (t, x, y, area, confidence)
+        self.count += 1
+
+    def spill(self):
+        """Move the in-memory rows to the spill file, or drop the oldest half without one"""
+        if self.spill_path is None:
+            half = self.capacity // 2
+            self.rows[:self.count - half] = self.rows[half:self.count]
+            self.count -= half
+            self.dropped += half
+            return
+        os.makedirs(os.path.dirname(self.spill_path) or ".", exist_ok=True)
+        with open(self.spill_path, "ab" if self.spilled else "wb") as f:
+            self.rows[:self.count].tofile(f)
+        self.spilled += self.count
+        self.count = 0
+
+    def recent(self):
+        """Copy of the rows still in memory"""
+        return self.rows[:self.count].copy()
+
+    def to_array(self):
+        """Every kept row, spilled ones first"""
+        if not self.spilled:
+            return self.recent()
+        return np.concatenate([np.fromfile(self.spill_path, dtype=TRAJECTORY_DTYPE), self.recent()])
+
+    def clear(self):
+        """Start over; the next spill truncates the spill file"""
+        self.count = 0
+        self.spilled = 0
+        self.dropped = 0
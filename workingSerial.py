@@ -3,7 +3,6 @@ import re
 import matplotlib.pyplot as plt
 import matplotlib.animation as animation
 from collections import deque
-import cv2
 
 
 # Configure serial port
@@ -43,11 +42,12 @@ def update(frame):
     return line1, line2
 
 def list_cameras(max_index=10):
+    # Probe all indices at once instead of waiting on each failed open in turn
+    from cameraDiscovery import probe_devices
+    results = probe_devices([str(index) for index in range(max_index)])
     for index in range(max_index):
-        cap = cv2.VideoCapture(index)
-        if cap.isOpened():
+        if results[str(index)] is not None:
             print(f"Camera index {index} is available.")
-            cap.release()
         else:
             print(f"Camera index {index} is not available.")
 